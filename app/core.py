@@ -1,16 +1,10 @@
 from dotenv import load_dotenv
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models import BaseChatModel
+
+from app.llm_gateway import get_chat_model
 
 load_dotenv()
 
-def get_llm(temperature: float = 0.0):
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("Missing GOOGLE_API_KEY in environment")
-    
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=api_key,
-        temperature=temperature
-    )
+def get_llm(temperature: float = 0.0) -> BaseChatModel:
+    """Shared Gemini client; invoke it through app.llm_gateway to get rate limiting and retries."""
+    return get_chat_model(temperature=temperature)
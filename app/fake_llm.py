@@ -0,0 +1,252 @@
+"""
+Deterministic offline stand-in for Gemini (LLM_BACKEND=fake).
+Lets benchmarks and CI exercise search, rerank, scoring and serialization
+without an API key or network:
+- replays responses recorded from real runs (LLM_RECORD_PATH) by prompt hash
+- otherwise returns per-stage canned text, or synthesizes output that matches
+  the structured-output / format-instruction schema
+- sleeps for a seeded, configurable synthetic latency per call
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.refiner.cache import content_hash
+
+# JSONL written by ResponseRecorder, plus optional hand-written {"stage", "text"} lines
+LLM_FAKE_RESPONSES = os.getenv("LLM_FAKE_RESPONSES", "")
+# fixed | uniform | lognormal, around LLM_FAKE_LATENCY_MS
+LLM_FAKE_LATENCY_DIST = os.getenv("LLM_FAKE_LATENCY_DIST", "fixed")
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+LLM_FAKE_LATENCY_SPREAD = float(os.getenv("LLM_FAKE_LATENCY_SPREAD", "0.5"))
+LLM_FAKE_SEED = int(os.getenv("LLM_FAKE_SEED", "0"))
+# When set, real Gemini responses are appended here for later replay
+LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH", "")
+
+STAGE_METADATA_KEY = "llm_stage"
+
+
+def prompt_hash(messages: List[BaseMessage]) -> str:
+    return content_hash(*[f"{m.type}:{m.content}" for m in messages])
+
+
+# =====================================================
+# Recorded / canned responses
+# =====================================================
+
+def load_responses(path: str) -> tuple:
+    """Returns ({prompt_hash: text}, {stage: text}) from a recording file."""
+    by_prompt: Dict[str, str] = {}
+    by_stage: Dict[str, str] = {}
+    if not path or not os.path.exists(path):
+        return by_prompt, by_stage
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("prompt_hash"):
+                by_prompt[entry["prompt_hash"]] = entry["text"]
+            elif entry.get("stage"):
+                by_stage[entry["stage"]] = entry["text"]
+    return by_prompt, by_stage
+
+
+class ResponseRecorder(BaseCallbackHandler):
+    """Appends every chat model response to a JSONL file the fake backend can replay."""
+
+    def __init__(self, path: str = LLM_RECORD_PATH):
+        self.path = path
+        self._prompts: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        stage = (metadata or {}).get(STAGE_METADATA_KEY, "")
+        self._prompts[run_id] = (stage, prompt_hash(messages[0]))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        stage, hashed = self._prompts.pop(run_id, ("", None))
+        if hashed is None or not response.generations or not response.generations[0]:
+            return
+        entry = {"stage": stage, "prompt_hash": hashed, "text": response.generations[0][0].text}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._prompts.pop(run_id, None)
+
+
+# =====================================================
+# Schema-driven synthesis
+# =====================================================
+
+def _resolve(schema: dict, root: dict) -> dict:
+    ref = schema.get("$ref")
+    if ref:
+        schema = root.get("$defs", {}).get(ref.split("/")[-1], {})
+    any_of = schema.get("anyOf")
+    if any_of:
+        # Optional[X] -> X
+        schema = next((s for s in any_of if s.get("type") != "null"), any_of[0])
+        return _resolve(schema, root)
+    return schema
+
+
+def synthesize(schema: dict, rng: random.Random, prompt: str, root: Optional[dict] = None, name: str = "value"):
+    """Deterministic value that validates against a (pydantic-generated) JSON schema."""
+    root = root or schema
+    schema = _resolve(schema, root)
+
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    kind = schema.get("type", "object" if "properties" in schema else "string")
+
+    if kind == "object":
+        return {
+            field: synthesize(sub, rng, prompt, root, field)
+            for field, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        item_schema = _resolve(schema.get("items", {}), root)
+        # One item per candidate for per-candidate outputs (batched explanations)
+        if "candidate_id" in item_schema.get("properties", {}):
+            ids = re.findall(r"candidate_id:\s*(\S+)", prompt)
+            return [
+                {**synthesize(item_schema, rng, prompt, root, name), "candidate_id": cid}
+                for cid in ids
+            ]
+        return [synthesize(item_schema, rng, prompt, root, name) for _ in range(2)]
+    if kind == "number":
+        low, high = schema.get("minimum", 0.0), schema.get("maximum", 1.0)
+        return round(rng.uniform(low, high), 2)
+    if kind == "integer":
+        low, high = schema.get("minimum", 0), schema.get("maximum", 10)
+        return rng.randint(int(low), int(high))
+    if kind == "boolean":
+        return rng.random() < 0.5
+
+    choices = re.fullmatch(r"\^\(([^()]*)\)\$", schema.get("pattern", ""))
+    if choices:
+        return choices.group(1).split("|")[0]
+    return f"synthetic {name.replace('_', ' ')} {rng.randrange(16 ** 6):06x}"
+
+
+def _schema_from_instructions(prompt: str) -> Optional[dict]:
+    """JSON schema embedded by PydanticOutputParser.get_format_instructions()."""
+    match = re.search(r"Here is the output schema:\s*```\s*(\{.*?\})\s*```", prompt, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def _synthesize_text(prompt: str, rng: random.Random) -> str:
+    # Mirrors the "VERSION n: ..." list format the multi-query prompt asks for
+    versions = re.findall(r"^\s*(VERSION \d+):", prompt, re.MULTILINE)
+    words = re.findall(r"[A-Za-z][A-Za-z+#.]{2,}", prompt)
+
+    def sample() -> str:
+        return " ".join(rng.sample(words, min(6, len(words)))) or "synthetic response"
+
+    if versions:
+        return "\n".join(f"{v}: {sample()}" for v in versions)
+    return f"Synthetic response: {sample()}."
+
+
+# =====================================================
+# Chat model
+# =====================================================
+
+class FakeChatModel(BaseChatModel):
+    model: str = "fake"
+    temperature: float = 0.0
+    responses_path: str = LLM_FAKE_RESPONSES
+    latency_dist: str = LLM_FAKE_LATENCY_DIST
+    latency_ms: float = LLM_FAKE_LATENCY_MS
+    latency_spread: float = LLM_FAKE_LATENCY_SPREAD
+    seed: int = LLM_FAKE_SEED
+
+    _by_prompt: Dict[str, str] = {}
+    _by_stage: Dict[str, str] = {}
+
+    def model_post_init(self, __context):
+        self._by_prompt, self._by_stage = load_responses(self.responses_path)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def with_structured_output(self, schema, **kwargs):
+        return self.bind(structured_schema=schema) | PydanticOutputParser(pydantic_object=schema)
+
+    def _rng(self, hashed: str, salt: str) -> random.Random:
+        # Seeded per prompt so results do not depend on call order or concurrency
+        return random.Random(f"{self.seed}:{salt}:{hashed}")
+
+    def _latency_s(self, hashed: str) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        rng = self._rng(hashed, "latency")
+        if self.latency_dist == "uniform":
+            spread = self.latency_ms * self.latency_spread
+            return max(0.0, rng.uniform(self.latency_ms - spread, self.latency_ms + spread)) / 1000
+        if self.latency_dist == "lognormal":
+            # latency_ms is the median; spread is sigma of the underlying normal
+            return self.latency_ms * rng.lognormvariate(0, self.latency_spread) / 1000
+        return self.latency_ms / 1000
+
+    def _respond(self, messages: List[BaseMessage], stage: str, schema=None) -> tuple:
+        hashed = prompt_hash(messages)
+        prompt = "\n".join(str(m.content) for m in messages)
+
+        if hashed in self._by_prompt:
+            text = self._by_prompt[hashed]
+        elif stage in self._by_stage:
+            text = self._by_stage[stage]
+        else:
+            rng = self._rng(hashed, "content")
+            json_schema = schema.model_json_schema() if schema is not None else _schema_from_instructions(prompt)
+            if json_schema is not None:
+                text = json.dumps(synthesize(json_schema, rng, prompt))
+            else:
+                text = _synthesize_text(prompt, rng)
+
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(text) // 4,
+                "total_tokens": (len(prompt) + len(text)) // 4
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)]), self._latency_s(hashed)
+
+    def _generate(self, messages, stop=None, run_manager=None, structured_schema=None, **kwargs):
+        stage = (run_manager.metadata if run_manager else {}).get(STAGE_METADATA_KEY, "")
+        result, latency = self._respond(messages, stage, structured_schema)
+        time.sleep(latency)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, structured_schema=None, **kwargs):
+        stage = (run_manager.metadata if run_manager else {}).get(STAGE_METADATA_KEY, "")
+        result, latency = self._respond(messages, stage, structured_schema)
+        await asyncio.sleep(latency)
+        return result
@@ -1,29 +1,41 @@
+import asyncio
+import hashlib
 import os
 from typing import List, Optional
 from langchain_community.document_loaders import PDFPlumberLoader, TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.documents import Document
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from app.vector_store import get_vectorstore
 from app.models import CandidateMetadata
+from app.skill_taxonomy import taxonomy, bits_to_hex
+from app.refiner.cache import get_deep_dive_cache
+from app.ingest_manifest import IngestManifest
+from app.vector_writer import upsert_documents
+from app.profile_store import get_profile_store, profile_from_metadata
+from app.resume_extractor import LocalExtraction, extract_local
+from app.resume_dedup import get_dedup_index, link_duplicates
+from app import llm_gateway
 
 load_dotenv()
 
+# Bump when the extraction prompt / schema changes so every file is re-extracted
+EXTRACTION_VERSION = "extract-v1"
+
 # --- 1. Define Metadata Schema ---
 # Moved to app.models
 
 # --- 2. Initialize Extraction Chain ---
 # Using Gemini Flash for speed and cost
-api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
 llm = None
 extraction_chain = None
 
-if api_key:
+if llm_gateway.llm_available():
     try:
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash",temperature=0) 
+        llm = llm_gateway.get_chat_model(temperature=0)
         parser = PydanticOutputParser(pydantic_object=CandidateMetadata)
 
         extraction_prompt = ChatPromptTemplate.from_template(
@@ -42,40 +54,279 @@ if api_key:
     except Exception as e:
         print(f"Failed to initialize Gemini: {e}")
 
+def _extraction_input(text: str) -> dict:
+    # We process the first 4000 chars roughly to capture the main profile
+    return {
+        "text": text[:4000],
+        "format_instructions": parser.get_format_instructions()
+    }
+
+
+# extraction_status other than "ok" marks the profile as degraded: the file is
+# still indexed (with whatever the local extractor found), and queued in the
+# manifest for re-extraction
+def _degraded_metadata(local: LocalExtraction, status: str, error: str, summary: str) -> dict:
+    result = local.metadata.model_dump()
+    result["summary"] = summary
+    result["extraction_status"] = status
+    result["extraction_error"] = error
+    result["extraction_method"] = "local"
+    result["extraction_confidence"] = local.confidence
+    return result
+
+
+def _disabled_metadata(local: LocalExtraction) -> dict:
+    return _degraded_metadata(local, "disabled", "No LLM configured", "AI Extraction Disabled (Missing Key)")
+
+
+def _failed_metadata(local: LocalExtraction, error: Exception) -> dict:
+    return _degraded_metadata(local, "failed", f"{type(error).__name__}: {error}", "Extraction failed")
+
+
+def _extracted_metadata(metadata: CandidateMetadata, source: str, method: str = "llm") -> dict:
+    result = metadata.model_dump()
+
+    # Extract candidate ID from source filename
+    candidate_id = os.path.splitext(source)[0]  # Remove file extension
+    result["candidate_id"] = candidate_id
+    result["extraction_status"] = "ok"
+    result["extraction_method"] = method
+
+    return result
+
+
+def _local_metadata(local: LocalExtraction, source: str) -> dict:
+    result = _extracted_metadata(local.metadata, source, method="local")
+    result["extraction_confidence"] = local.confidence
+    return result
+
+
 def extract_metadata(text: str, source: str) -> dict:
-    """Helper to run LLM extraction on full resume text."""
+    """
+    Extracts profile metadata from full resume text. The local rule-based
+    extractor runs first; the LLM is only called when its confidence is low.
+    """
+    local = extract_local(text)
+    if local.is_confident:
+        return _local_metadata(local, source)
     if not extraction_chain:
-         return {
-            "summary": "AI Extraction Disabled (Missing Key)",
-            "top_skills": [],
-            "years_of_experience": None,
-            "job_title": None,
-        }
+        return _disabled_metadata(local)
 
     try:
-        # We process the first 4000 chars roughly to capture the main profile
-        print(f"Extracting metadata from {source}...")
-        metadata = extraction_chain.invoke({
-            "text": text[:4000],
-            "format_instructions": parser.get_format_instructions()
-        })
-        result = metadata.model_dump()
-        
-        # Extract candidate ID from source filename
-        candidate_id = os.path.splitext(source)[0]  # Remove file extension
-        result["candidate_id"] = candidate_id
-        
-        return result
+        print(f"Extracting metadata from {source} (local confidence {local.confidence})...")
+        metadata = llm_gateway.invoke("ingest_extract", extraction_chain, _extraction_input(text))
+        return _extracted_metadata(metadata, source)
     except Exception as e:
         print(f"Error extracting metadata for {source}: {e}")
-        return {
-            "summary": "Extraction failed",
-            "top_skills": [],
-            "years_of_experience": None,
-            "job_title": None,
-        }
-
-def ingest_documents(directory_path: str):
+        return _failed_metadata(local, e)
+
+
+async def aextract_metadata(text: str, source: str) -> dict:
+    """Async twin of extract_metadata for the concurrent ingest pipeline."""
+    local = extract_local(text)
+    if local.is_confident:
+        return _local_metadata(local, source)
+    if not extraction_chain:
+        return _disabled_metadata(local)
+
+    try:
+        print(f"Extracting metadata from {source} (local confidence {local.confidence})...")
+        metadata = await llm_gateway.ainvoke("ingest_extract", extraction_chain, _extraction_input(text))
+        return _extracted_metadata(metadata, source)
+    except Exception as e:
+        print(f"Error extracting metadata for {source}: {e}")
+        return _failed_metadata(local, e)
+
+
+# --- 3. Per-file stages (shared by the sequential and pipelined ingest) ---
+
+class IngestItem:
+    """One resume file on its way through ingest."""
+
+    def __init__(
+        self,
+        file_path: str,
+        content_hash: str,
+        file_size: Optional[int] = None,
+        file_mtime_ns: Optional[int] = None
+    ):
+        self.file_path = os.path.abspath(file_path)
+        self.filename = os.path.basename(file_path)
+        self.content_hash = content_hash
+        self.file_size = file_size
+        self.file_mtime_ns = file_mtime_ns
+        self.docs: List[Document] = []
+        self.full_text = ""
+        self.meta_data: dict = {}
+        self.splits: List[Document] = []
+
+    @property
+    def candidate_id(self) -> str:
+        return os.path.splitext(self.filename)[0]
+
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prepare_item(manifest: IngestManifest, file_path: str, force: bool = False) -> Optional[IngestItem]:
+    """
+    IngestItem for a file that needs (re-)ingesting, or None if the manifest
+    already has it. Size/mtime are checked first so resuming a large import
+    does not re-hash every committed file.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    if not force and manifest.is_unchanged_on_disk(path, stat.st_size, stat.st_mtime_ns, EXTRACTION_VERSION):
+        return None
+
+    item = IngestItem(path, file_hash(path), stat.st_size, stat.st_mtime_ns)
+    if not force and manifest.is_current(path, item.content_hash, EXTRACTION_VERSION):
+        # Touched or copied, content unchanged
+        manifest.update_stat(path, stat.st_size, stat.st_mtime_ns)
+        return None
+    return item
+
+
+def chunk_ids(candidate_id: str, count: int) -> List[str]:
+    """Stable IDs, so re-ingesting a file overwrites its chunks instead of duplicating them."""
+    return [f"{candidate_id}:{ordinal}" for ordinal in range(count)]
+
+
+def is_supported_file(filename: str) -> bool:
+    return filename.endswith(".pdf") or filename.endswith(".txt")
+
+
+def load_file(file_path: str) -> List[Document]:
+    """Parses one resume. CPU-bound, so the pipeline runs it in a worker process."""
+    filename = os.path.basename(file_path)
+    if filename.endswith(".pdf"):
+        # Using PDFPlumber for better table extraction
+        return PDFPlumberLoader(file_path).load()
+    elif filename.endswith(".txt"):
+        return TextLoader(file_path, encoding='utf-8').load()
+    return []
+
+
+def complete_metadata(meta_data: dict, filename: str) -> dict:
+    """Adds the fields ingest owns (source, candidate_id, skill bitset) to extracted metadata."""
+    meta_data["source"] = filename # Keep filename as source
+
+    # Set candidate_id from filename (without extension)
+    meta_data["candidate_id"] = os.path.splitext(filename)[0]
+
+    print(f"  -> Extracted: {len(meta_data['top_skills'])} skills")
+
+    # Normalize skills to taxonomy IDs once here instead of on every search
+    meta_data["skill_bitset"] = bits_to_hex(taxonomy.encode(meta_data["top_skills"], add=True))
+    return meta_data
+
+
+def split_with_metadata(docs: List[Document], meta_data: dict) -> List[Document]:
+    # Revised Strategy: larger chunks (1000) with good overlap (200) to keep context
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    splits = text_splitter.split_documents(docs)
+
+    for ordinal, split in enumerate(splits):
+        # The AI metadata lives once per candidate in the profile store;
+        # chunks only carry what search needs to hydrate it
+        split.metadata = {"candidate_id": meta_data["candidate_id"], "chunk": ordinal}
+
+    return splits
+
+
+def invalidate_candidate_caches(candidate_id: str):
+    # Re-ingested profile: drop its cached explanations / judge scores
+    cache = get_deep_dive_cache()
+    if cache is not None:
+        cache.invalidate_candidate(candidate_id)
+
+
+def commit_items(vectorstore, manifest: IngestManifest, items: List[IngestItem]):
+    """
+    Stores the candidates' profiles, writes the chunks of several files in
+    one bulk call, then drops chunks the
+    new versions no longer have and records the files in the manifest.
+    Chunks are upserted by stable ID, so a modified file is never missing or duplicated.
+    """
+    previous = {item.file_path: manifest.get(item.file_path) for item in items}
+
+    # Persist skill IDs first: the profiles and the manifest entries written below
+    # hold bitsets of them, and a run killed after this flush resumes past these files
+    taxonomy.save()
+
+    for item in items:
+        # Link re-uploaded versions of the same resume to one canonical candidate
+        canonical_id = link_duplicates(item.candidate_id, item.full_text)
+        if canonical_id != item.candidate_id:
+            print(f"  -> {item.filename} is a near-duplicate of candidate {canonical_id}")
+
+    get_profile_store().upsert_many([profile_from_metadata(item.meta_data) for item in items])
+
+    for item in items:
+        if previous[item.file_path] is None:
+            # First time through the manifest: clear chunks written before it existed
+            vectorstore.delete(where={"candidate_id": item.candidate_id})
+
+    ids = {item.file_path: chunk_ids(item.candidate_id, len(item.splits)) for item in items}
+    upsert_documents(
+        vectorstore,
+        [chunk_id for item in items for chunk_id in ids[item.file_path]],
+        [split for item in items for split in item.splits]
+    )
+
+    for item in items:
+        entry = previous[item.file_path]
+        if entry is not None:
+            stale = sorted(set(entry["chunk_ids"]) - set(ids[item.file_path]))
+            if stale:
+                vectorstore.delete(ids=stale)
+        status = item.meta_data.get("extraction_status", "ok")
+        manifest.record(
+            item.file_path, item.content_hash, item.candidate_id, ids[item.file_path], EXTRACTION_VERSION,
+            extraction_status=status, file_size=item.file_size, file_mtime_ns=item.file_mtime_ns
+        )
+        if status == "ok":
+            manifest.clear_retry(item.file_path)
+        else:
+            manifest.enqueue_retry(item.file_path, item.meta_data.get("extraction_error", status))
+        invalidate_candidate_caches(item.candidate_id)
+
+
+def remove_deleted_files(vectorstore, manifest: IngestManifest, directory_path: str, current_paths: List[str]) -> int:
+    """Deletes the chunks of files that disappeared from the directory since the last run."""
+    current = {os.path.abspath(path) for path in current_paths}
+    removed = 0
+    for path in manifest.paths_under(directory_path):
+        if path in current:
+            continue
+        entry = manifest.get(path)
+        if entry["chunk_ids"]:
+            vectorstore.delete(ids=entry["chunk_ids"])
+        manifest.remove(path)
+        get_profile_store().delete(entry["candidate_id"])
+        dedup_index = get_dedup_index()
+        if dedup_index is not None:
+            dedup_index.remove(entry["candidate_id"])
+        invalidate_candidate_caches(entry["candidate_id"])
+        print(f"  -> Removed {len(entry['chunk_ids'])} chunks of deleted file {os.path.basename(path)}")
+        removed += 1
+    return removed
+
+
+def list_resume_files(directory_path: str) -> List[str]:
+    return [
+        os.path.join(directory_path, filename)
+        for filename in sorted(os.listdir(directory_path))
+        if is_supported_file(filename)
+    ]
+
+
+def ingest_documents(directory_path: str, sequential: bool = False, force: bool = False):
     """
     Ingests PDF/Text files:
     1. Loads full text.
@@ -83,84 +334,110 @@ def ingest_documents(directory_path: str):
     3. Chunks text.
     4. Attaches metadata to chunks.
     5. Saves to Vector DB.
+
+    By default the steps run as a staged pipeline (app.ingest_pipeline):
+    parsing in a process pool, extraction with bounded concurrency and
+    batched writes. sequential=True keeps the one-file-at-a-time loop.
+
+    Files whose content hash and extraction version match the manifest are
+    skipped unless force=True; chunks of files deleted from the directory are removed.
     """
     if not os.path.exists(directory_path):
         print(f"Directory not found: {directory_path}")
         return
 
+    manifest = IngestManifest()
+    file_paths = list_resume_files(directory_path)
+
+    if sequential:
+        _ingest_sequential(file_paths, manifest, force)
+    else:
+        from app.ingest_pipeline import IngestPipeline
+        asyncio.run(IngestPipeline(manifest=manifest, force=force).run(file_paths))
+
+    remove_deleted_files(get_vectorstore(), manifest, directory_path, file_paths)
+
+    # Persist any skills first seen in this run so stored bitsets stay decodable
+    taxonomy.save()
+
+    degraded = manifest.degraded_paths()
+    if degraded:
+        print(f"{len(degraded)} files have degraded metadata; retry with: python -m app.ingest --reextract")
+
+
+def reextract(all_degraded: bool = False, sequential: bool = False):
+    """
+    Re-runs extraction for failed / degraded profiles only. By default takes
+    the retry queue entries whose backoff has elapsed; all_degraded=True
+    takes every degraded file regardless of backoff or attempt count.
+    """
+    manifest = IngestManifest()
+    paths = manifest.degraded_paths() if all_degraded else manifest.due_retries()
+    paths = [path for path in paths if os.path.exists(path)]
+    print(f"Re-extracting {len(paths)} files...")
+    if not paths:
+        return
+
+    if sequential:
+        _ingest_sequential(paths, manifest, force=True)
+    else:
+        from app.ingest_pipeline import IngestPipeline
+        asyncio.run(IngestPipeline(manifest=manifest, force=True).run(paths))
+
+    taxonomy.save()
+
+
+def _ingest_sequential(file_paths: List[str], manifest: IngestManifest, force: bool = False):
     vectorstore = get_vectorstore()
     
-    for filename in os.listdir(directory_path):
-        file_path = os.path.join(directory_path, filename)
-        
+    for file_path in file_paths:
         # A. Load File
-        docs = []
         try:
-            if filename.endswith(".pdf"):
-                # Using PDFPlumber for better table extraction
-                docs = PDFPlumberLoader(file_path).load()
-            elif filename.endswith(".txt"):
-                docs = TextLoader(file_path, encoding='utf-8').load()
+            item = prepare_item(manifest, file_path, force)
+            if item is None:
+                continue
+            item.docs = load_file(file_path)
         except Exception as e:
-            print(f"Skipping {filename}: {e}")
+            print(f"Skipping {os.path.basename(file_path)}: {e}")
             continue
             
-        if not docs:
+        if not item.docs:
             continue
 
         # B. Merge text for AI analysis (Resume is usually one logical document)
-        full_text = "\n".join([d.page_content for d in docs])
-        print(f"  -> Extracted Text Length: {len(full_text)} chars")
+        item.full_text = "\n".join([d.page_content for d in item.docs])
+        print(f"  -> Extracted Text Length: {len(item.full_text)} chars")
         
-        if not full_text:
-             print(f"  -> WARNING: No text extracted from {filename}. Is it scanned?")
+        if not item.full_text:
+             print(f"  -> WARNING: No text extracted from {item.filename}. Is it scanned?")
              continue
         
         # C. Extract Metadata
-        meta_data = extract_metadata(full_text, filename)
-        meta_data["source"] = filename # Keep filename as source
-        
-        # Set candidate_id from filename (without extension)
-        candidate_id = os.path.splitext(filename)[0]
-        meta_data["candidate_id"] = candidate_id
-        
-        print(f"  -> Extracted: {len(meta_data['top_skills'])} skills")
+        item.meta_data = complete_metadata(extract_metadata(item.full_text, item.filename), item.filename)
 
         # D. Split & Attach Metadata
-        # Revised Strategy: larger chunks (1000) with good overlap (200) to keep context
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
-        
-        for split in splits:
-            # We add the AI metadata to *every* chunk
-            # For now, keeping skills as string due to ChromaDB limitations
-            # Later, we'll handle the conversion back to list in the search adapter
-            safe_metadata = meta_data.copy()
-            if "top_skills" in safe_metadata and isinstance(safe_metadata["top_skills"], list):
-                safe_metadata["top_skills_string"] = ", ".join(safe_metadata["top_skills"])  # Keep as string for storage
-                safe_metadata["top_skills"] = safe_metadata["top_skills"]  # Also keep the original list
-            else:
-                safe_metadata["top_skills_string"] = str(safe_metadata.get("top_skills", ""))
-            
-            split.metadata.update(safe_metadata)
-            # For now, let's keep page_content as is, but metadata is rich.
+        item.splits = split_with_metadata(item.docs, item.meta_data)
         
         # E. Save
-        if splits:
+        if item.splits:
             try:
-                vectorstore.add_documents(splits)
-                print(f"  -> Saved {len(splits)} chunks to DB.")
+                commit_items(vectorstore, manifest, [item])
+                print(f"  -> Saved {len(item.splits)} chunks to DB.")
             except Exception as e:
-                print(f"  -> Error saving to DB for {filename}: {e}")
+                print(f"  -> Error saving to DB for {item.filename}: {e}")
         else:
-            print(f"  -> No splits found for {filename}. Skipping DB save.")
+            print(f"  -> No splits found for {item.filename}. Skipping DB save.")
 
 if __name__ == "__main__":
+    import sys
+
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     data_dir = os.path.join(base_dir, "data")
     
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
         print("Please add PDFs to the 'data' folder.")
+    elif "--reextract" in sys.argv or "--reextract-all" in sys.argv:
+        reextract(all_degraded="--reextract-all" in sys.argv, sequential="--sequential" in sys.argv)
     else:
-        ingest_documents(data_dir)
+        ingest_documents(data_dir, sequential="--sequential" in sys.argv, force="--force" in sys.argv)
@@ -0,0 +1,257 @@
+"""
+Streaming ingestion daemon.
+
+    python -m app.ingest_daemon [directory]
+
+Watches the resume directory (watchdog if installed, otherwise mtime/size
+polling), debounces bursts of writes, and feeds new or changed files through
+the ingest pipeline in bounded batches; deleted files are removed from the
+index. Failed extractions are retried from the manifest's retry queue once
+their backoff elapses. Lag from a file landing to it being searchable is written to
+INGEST_STATUS_PATH, which the API serves at /api/v1/ingest/status.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.ingest import IngestItem, is_supported_file, remove_deleted_files
+from app.ingest_manifest import IngestManifest
+from app.ingest_pipeline import IngestPipeline
+from app.ingest_status import INGEST_STATUS_PATH, write_status
+from app.skill_taxonomy import taxonomy
+from app.vector_store import get_vectorstore
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional; polling is the fallback
+    Observer = None
+    FileSystemEventHandler = object
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Full directory scan interval: every poll without watchdog, a reconciliation pass with it
+INGEST_POLL_INTERVAL_S = float(os.getenv("INGEST_POLL_INTERVAL_S", "2"))
+INGEST_RESCAN_INTERVAL_S = float(os.getenv("INGEST_RESCAN_INTERVAL_S", "60"))
+# A file is ingested once it has not changed for this long; keep it above the
+# poll interval when polling, so a file still being copied is seen changing
+INGEST_DEBOUNCE_S = float(os.getenv("INGEST_DEBOUNCE_S", "3.0"))
+# Files handed to one pipeline run; the rest wait (backpressure)
+INGEST_DAEMON_MAX_BATCH = int(os.getenv("INGEST_DAEMON_MAX_BATCH", "200"))
+
+
+class IngestLagMetrics:
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.files_ingested = 0
+        self.files_removed = 0
+        self.last_lag_s: Optional[float] = None
+        self.max_lag_s = 0.0
+        self._recent: List[float] = []
+        self.last_batch_at: Optional[float] = None
+
+    def observe(self, lag_s: float):
+        self.files_ingested += 1
+        self.last_lag_s = lag_s
+        self.max_lag_s = max(self.max_lag_s, lag_s)
+        self._recent = (self._recent + [lag_s])[-self.window:]
+
+    def as_dict(self, pending: int, oldest_pending_s: float) -> dict:
+        recent = sorted(self._recent)
+        return {
+            "files_ingested": self.files_ingested,
+            "files_removed": self.files_removed,
+            "pending_files": pending,
+            "oldest_pending_s": round(oldest_pending_s, 2),
+            "last_lag_s": round(self.last_lag_s, 2) if self.last_lag_s is not None else None,
+            "avg_lag_s": round(sum(recent) / len(recent), 2) if recent else None,
+            "p95_lag_s": round(recent[int(0.95 * (len(recent) - 1))], 2) if recent else None,
+            "max_lag_s": round(self.max_lag_s, 2),
+            "last_batch_at": self.last_batch_at,
+            "updated_at": time.time(),
+        }
+
+
+class _ChangeHandler(FileSystemEventHandler):
+
+    def __init__(self, daemon: "IngestDaemon"):
+        self.daemon = daemon
+
+    def on_any_event(self, event):
+        if getattr(event, "is_directory", False):
+            return
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path and is_supported_file(os.path.basename(path)):
+                self.daemon.notify(path)
+
+
+class IngestDaemon:
+
+    def __init__(
+        self,
+        directory_path: str,
+        poll_interval: float = INGEST_POLL_INTERVAL_S,
+        rescan_interval: float = INGEST_RESCAN_INTERVAL_S,
+        debounce_s: float = INGEST_DEBOUNCE_S,
+        max_batch: int = INGEST_DAEMON_MAX_BATCH,
+        status_path: str = INGEST_STATUS_PATH,
+        pipeline: Optional[IngestPipeline] = None
+    ):
+        self.directory_path = os.path.abspath(directory_path)
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.debounce_s = debounce_s
+        self.max_batch = max(1, max_batch)
+        self.status_path = status_path
+        self.manifest = IngestManifest()
+        self.pipeline = pipeline or IngestPipeline(manifest=self.manifest, on_written=self._on_written)
+        self.retry_pipeline = IngestPipeline(manifest=self.manifest, force=True)
+        self.metrics = IngestLagMetrics()
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._snapshot: Dict[str, tuple] = {}
+        # path -> (monotonic time of the last change seen, wall-clock time first detected)
+        self._pending: Dict[str, tuple] = {}
+        # Detection times of the batch being ingested, for lag
+        self._ready_detected: Dict[str, float] = {}
+        self._deletions = False
+        self._last_scan = 0.0
+        self._observer = None
+
+    # ---------- Change detection ----------
+
+    def notify(self, path: str):
+        """Called by the watcher (or tests) when a path changed."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if os.path.exists(path):
+                self._mark(path)
+            else:
+                self._pending.pop(path, None)
+                self._snapshot.pop(path, None)
+                self._deletions = True
+        self._wake.set()
+
+    def _mark(self, path: str):
+        first_seen = self._pending.get(path, (0.0, time.time()))[1]
+        self._pending[path] = (time.monotonic(), first_seen)
+
+    def _scan(self):
+        current = {}
+        with os.scandir(self.directory_path) as entries:
+            for entry in entries:
+                if entry.is_file() and is_supported_file(entry.name):
+                    stat = entry.stat()
+                    current[os.path.abspath(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            for path, signature in current.items():
+                if self._snapshot.get(path) != signature:
+                    self._mark(path)
+            if set(self._snapshot) - set(current):
+                self._deletions = True
+            for path in list(self._pending):
+                if path not in current:
+                    self._pending.pop(path)
+            self._snapshot = current
+        self._last_scan = time.monotonic()
+
+    def _take_ready(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            ready = sorted(
+                (path for path, (changed_at, _) in self._pending.items() if now - changed_at >= self.debounce_s),
+                key=lambda path: self._pending[path][1]
+            )[:self.max_batch]
+            self._ready_detected = {path: self._pending.pop(path)[1] for path in ready}
+        return ready
+
+    # ---------- Ingestion ----------
+
+    def _on_written(self, items: List[IngestItem]):
+        now = time.time()
+        for item in items:
+            detected = self._ready_detected.get(item.file_path, now)
+            self.metrics.observe(now - detected)
+
+    def run_once(self):
+        interval = self.rescan_interval if self._observer is not None else self.poll_interval
+        if time.monotonic() - self._last_scan >= interval:
+            self._scan()
+
+        ready = self._take_ready()
+        if ready:
+            # Unchanged content (e.g. touch) is skipped by the manifest inside the pipeline
+            asyncio.run(self.pipeline.run(ready))
+            taxonomy.save()
+            self.metrics.last_batch_at = time.time()
+        else:
+            # Idle: re-extract failed profiles whose backoff has elapsed
+            retries = [path for path in self.manifest.due_retries(limit=self.max_batch) if os.path.exists(path)]
+            if retries:
+                asyncio.run(self.retry_pipeline.run(retries))
+                taxonomy.save()
+
+        if self._deletions:
+            # In watch mode the snapshot only changes on rescans, so files created (and
+            # ingested) since the last one are missing from it; rescan so they are kept
+            self._scan()
+            with self._lock:
+                self._deletions = False
+                current = list(self._snapshot)
+            self.metrics.files_removed += remove_deleted_files(
+                get_vectorstore(), self.manifest, self.directory_path, current
+            )
+
+        self._write_status()
+
+    def _write_status(self):
+        with self._lock:
+            pending = len(self._pending)
+            oldest = min((first for _, first in self._pending.values()), default=None)
+        status = self.metrics.as_dict(pending, time.time() - oldest if oldest else 0.0)
+        status["directory"] = self.directory_path
+        status["mode"] = "watch" if self._observer is not None else "poll"
+
+        write_status(status, self.status_path)
+
+    def start_watcher(self) -> bool:
+        if Observer is None:
+            return False
+        self._observer = Observer()
+        self._observer.schedule(_ChangeHandler(self), self.directory_path, recursive=False)
+        self._observer.start()
+        return True
+
+    def run_forever(self):
+        mode = "watching" if self.start_watcher() else "polling"
+        print(f"[ingest-daemon] {mode} {self.directory_path}")
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"[ingest-daemon] cycle failed: {e}")
+                self._wake.wait(timeout=min(self.poll_interval, self.debounce_s))
+                self._wake.clear()
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+if __name__ == "__main__":
+    import sys
+
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    IngestDaemon(data_dir).run_forever()
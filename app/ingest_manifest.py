@@ -0,0 +1,174 @@
+"""
+Ingestion manifest: what is in the vector store, per resume file.
+Records path, content hash, candidate_id, chunk IDs and extraction version so
+re-runs only pay for new, modified and deleted files. Rows are committed as
+files are written, so it doubles as the checkpoint a crashed bulk import
+resumes from. Files whose metadata extraction failed are indexed as
+"degraded" and kept in a retry queue with exponential backoff.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from app.rate_limit import backoff_delay
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(base_dir, "ingest_manifest.sqlite"))
+INGEST_RETRY_BASE_S = float(os.getenv("INGEST_RETRY_BASE_S", "60"))
+INGEST_RETRY_MAX_S = float(os.getenv("INGEST_RETRY_MAX_S", "21600"))
+INGEST_RETRY_MAX_ATTEMPTS = int(os.getenv("INGEST_RETRY_MAX_ATTEMPTS", "8"))
+
+_FILE_COLUMNS = (
+    "path", "content_hash", "candidate_id", "chunk_ids", "extraction_version",
+    "ingested_at", "extraction_status", "file_size", "file_mtime_ns"
+)
+
+
+class IngestManifest:
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                candidate_id TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                extraction_version TEXT NOT NULL,
+                ingested_at REAL NOT NULL
+            )"""
+        )
+        # Columns added after the first release of the manifest
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        for column, definition in (
+            ("extraction_status", "TEXT NOT NULL DEFAULT 'ok'"),
+            ("file_size", "INTEGER"),
+            ("file_mtime_ns", "INTEGER"),
+        ):
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE files ADD COLUMN {column} {definition}")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS retry_queue (
+                path TEXT PRIMARY KEY,
+                attempts INTEGER NOT NULL,
+                last_error TEXT NOT NULL,
+                next_attempt_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_candidate ON files(candidate_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_retry_due ON retry_queue(next_attempt_at)")
+        self._conn.commit()
+
+    def get(self, path: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_FILE_COLUMNS)} FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(_FILE_COLUMNS, row))
+        entry["chunk_ids"] = json.loads(entry["chunk_ids"])
+        return entry
+
+    def is_unchanged_on_disk(self, path: str, file_size: int, file_mtime_ns: int, extraction_version: str) -> bool:
+        """Cheap check (no hashing) used when resuming a large import."""
+        entry = self.get(path)
+        return (
+            entry is not None
+            and entry["file_size"] == file_size
+            and entry["file_mtime_ns"] == file_mtime_ns
+            and entry["extraction_version"] == extraction_version
+        )
+
+    def update_stat(self, path: str, file_size: int, file_mtime_ns: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET file_size = ?, file_mtime_ns = ? WHERE path = ?",
+                (file_size, file_mtime_ns, path)
+            )
+            self._conn.commit()
+
+    def is_current(self, path: str, content_hash: str, extraction_version: str) -> bool:
+        entry = self.get(path)
+        return (
+            entry is not None
+            and entry["content_hash"] == content_hash
+            and entry["extraction_version"] == extraction_version
+        )
+
+    def record(
+        self,
+        path: str,
+        content_hash: str,
+        candidate_id: str,
+        chunk_ids: List[str],
+        extraction_version: str,
+        extraction_status: str = "ok",
+        file_size: Optional[int] = None,
+        file_mtime_ns: Optional[int] = None
+    ):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO files ({', '.join(_FILE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_FILE_COLUMNS))})",
+                (
+                    path, content_hash, candidate_id, json.dumps(chunk_ids), extraction_version,
+                    time.time(), extraction_status, file_size, file_mtime_ns
+                )
+            )
+            self._conn.commit()
+
+    def remove(self, path: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._conn.execute("DELETE FROM retry_queue WHERE path = ?", (path,))
+            self._conn.commit()
+
+    # ---------- Failed extraction retry queue ----------
+
+    def enqueue_retry(self, path: str, error: str):
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM retry_queue WHERE path = ?", (path,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            delay = backoff_delay(attempts - 1, base_delay=INGEST_RETRY_BASE_S, max_delay=INGEST_RETRY_MAX_S)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retry_queue (path, attempts, last_error, next_attempt_at) "
+                "VALUES (?, ?, ?, ?)",
+                (path, attempts, error, time.time() + delay)
+            )
+            self._conn.commit()
+
+    def clear_retry(self, path: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM retry_queue WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def due_retries(self, max_attempts: int = INGEST_RETRY_MAX_ATTEMPTS, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM retry_queue WHERE next_attempt_at <= ? AND attempts < ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (time.time(), max_attempts, -1 if limit is None else limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def degraded_paths(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE extraction_status != 'ok' ORDER BY path"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def paths_under(self, directory_path: str) -> List[str]:
+        prefix = os.path.join(os.path.abspath(directory_path), "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return [row[0] for row in rows]
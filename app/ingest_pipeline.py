@@ -0,0 +1,264 @@
+"""
+Staged, bounded-queue ingestion pipeline.
+
+    files -> [parse: process pool] -> parsed queue
+          -> [extract: N async LLM workers] -> chunk queue
+          -> [write: write-behind buffer, batched embed + bulk upsert]
+
+Each queue is bounded, so at most ~queue_size parsed resumes and
+queue_size + write_batch chunks are held in memory regardless of how many
+files are ingested. LLM calls are additionally throttled by app.llm_gateway.
+Files unchanged since the last run (per the ingest manifest) never leave the
+parse stage.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+from app.ingest import (
+    IngestItem,
+    aextract_metadata,
+    commit_items,
+    complete_metadata,
+    load_file,
+    prepare_item,
+    split_with_metadata
+)
+from app.ingest_manifest import IngestManifest
+from app.vector_store import get_vectorstore
+from app.vector_writer import WRITE_BUFFER_CHUNKS, VectorWriteBuffer
+
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 2)))
+INGEST_EXTRACT_CONCURRENCY = int(os.getenv("INGEST_EXTRACT_CONCURRENCY", "8"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+INGEST_PROGRESS_EVERY_S = float(os.getenv("INGEST_PROGRESS_EVERY_S", "5"))
+
+_DONE = None
+
+
+class IngestProgress:
+
+    def __init__(self, total_files: int):
+        self.total_files = total_files
+        self.started_at = time.monotonic()
+        self.parsed = 0
+        self.extracted = 0
+        self.written = 0
+        self.chunks = 0
+        self.failed = 0
+        self.skipped = 0
+        self.unchanged = 0
+        self.degraded = 0
+        # Extracted by the local fast path, without an LLM call
+        self.local = 0
+
+    def as_dict(self) -> dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "total_files": self.total_files,
+            "parsed": self.parsed,
+            "extracted": self.extracted,
+            "written": self.written,
+            "chunks": self.chunks,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "unchanged": self.unchanged,
+            "degraded": self.degraded,
+            "local": self.local,
+            "elapsed_s": round(elapsed, 1),
+            "files_per_s": round(self.written / elapsed, 2),
+            "chunks_per_s": round(self.chunks / elapsed, 2),
+        }
+
+    def report(self, parsed_queue: int = 0, chunk_queue: int = 0):
+        stats = self.as_dict()
+        print(
+            f"[ingest] {stats['written']}/{self.total_files} files written "
+            f"(parsed {stats['parsed']}, extracted {stats['extracted']} ({stats['local']} locally), "
+            f"failed {stats['failed']}, skipped {stats['skipped']}, unchanged {stats['unchanged']}, degraded {stats['degraded']}), "
+            f"{stats['chunks']} chunks, {stats['files_per_s']} files/s, "
+            f"{stats['chunks_per_s']} chunks/s, queues parsed={parsed_queue} chunks={chunk_queue}"
+        )
+
+
+class IngestPipeline:
+
+    def __init__(
+        self,
+        parse_workers: int = INGEST_PARSE_WORKERS,
+        extract_concurrency: int = INGEST_EXTRACT_CONCURRENCY,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        write_batch: int = WRITE_BUFFER_CHUNKS,
+        manifest: Optional[IngestManifest] = None,
+        force: bool = False,
+        on_written: Optional[Callable[[List[IngestItem]], None]] = None
+    ):
+        # parse_workers=0 parses on a thread in this process (no multiprocessing)
+        self.parse_workers = parse_workers
+        self.extract_concurrency = max(1, extract_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.write_batch = max(1, write_batch)
+        self.manifest = manifest or IngestManifest()
+        # Re-ingest files even when the manifest says they are current
+        self.force = force
+        # Called with the files of every successful flush (e.g. ingest lag metrics)
+        self.on_written = on_written
+
+    async def run(self, file_paths: List[str]) -> IngestProgress:
+        progress = IngestProgress(len(file_paths))
+        parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        paths = iter(file_paths)
+
+        pool = ProcessPoolExecutor(self.parse_workers) if self.parse_workers > 0 else None
+        reporter = asyncio.create_task(self._report(progress, parsed_queue, chunk_queue))
+        tasks = []
+        try:
+            parsers = [
+                asyncio.create_task(self._parse_stage(paths, pool, parsed_queue, progress))
+                for _ in range(max(1, self.parse_workers))
+            ]
+            extractors = [
+                asyncio.create_task(self._extract_stage(parsed_queue, chunk_queue, progress))
+                for _ in range(self.extract_concurrency)
+            ]
+            writer = asyncio.create_task(self._write_stage(chunk_queue, progress))
+            shutdown = asyncio.create_task(
+                self._shut_down_in_order(parsers, extractors, writer, parsed_queue, chunk_queue)
+            )
+            tasks = [*parsers, *extractors, writer, shutdown]
+
+            # A stage that dies stops draining its queue and would leave the
+            # stages before it blocked on put() forever: fail the whole run
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            reporter.cancel()
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        progress.report()
+        return progress
+
+    @staticmethod
+    async def _shut_down_in_order(
+        parsers: List[asyncio.Task],
+        extractors: List[asyncio.Task],
+        writer: asyncio.Task,
+        parsed_queue: asyncio.Queue,
+        chunk_queue: asyncio.Queue
+    ):
+        """Ends each stage once the stage feeding it has finished."""
+        await asyncio.gather(*parsers)
+        for _ in extractors:
+            await parsed_queue.put(_DONE)
+        await asyncio.gather(*extractors)
+        await chunk_queue.put(_DONE)
+        await writer
+
+    # ---------- Stages ----------
+
+    async def _parse_stage(
+        self,
+        paths: Iterator[str],
+        pool: Optional[ProcessPoolExecutor],
+        parsed_queue: asyncio.Queue,
+        progress: IngestProgress
+    ):
+        loop = asyncio.get_running_loop()
+        # Workers share one iterator, so each file is taken exactly once
+        for file_path in paths:
+            try:
+                item = await asyncio.to_thread(prepare_item, self.manifest, file_path, self.force)
+                if item is None:
+                    progress.unchanged += 1
+                    continue
+                item.docs = await loop.run_in_executor(pool, load_file, file_path)
+            except Exception as e:
+                print(f"Skipping {os.path.basename(file_path)}: {e}")
+                progress.failed += 1
+                continue
+
+            item.full_text = "\n".join([d.page_content for d in item.docs])
+            if not item.full_text:
+                print(f"  -> WARNING: No text extracted from {item.filename}. Is it scanned?")
+                progress.skipped += 1
+                continue
+
+            progress.parsed += 1
+            # Blocks when extraction falls behind (backpressure)
+            await parsed_queue.put(item)
+
+    async def _extract_stage(
+        self,
+        parsed_queue: asyncio.Queue,
+        chunk_queue: asyncio.Queue,
+        progress: IngestProgress
+    ):
+        while True:
+            item = await parsed_queue.get()
+            if item is _DONE:
+                return
+
+            try:
+                metadata = await aextract_metadata(item.full_text, item.filename)
+                item.meta_data = complete_metadata(metadata, item.filename)
+                item.splits = split_with_metadata(item.docs, item.meta_data)
+            except Exception as e:
+                print(f"Skipping {item.filename}: {e}")
+                progress.failed += 1
+                # Not recorded in the manifest, so the next run picks it up again; the daemon retries it
+                await asyncio.to_thread(self.manifest.enqueue_retry, item.file_path, str(e))
+                continue
+            progress.extracted += 1
+            if item.meta_data.get("extraction_status") != "ok":
+                progress.degraded += 1
+            elif item.meta_data.get("extraction_method") == "local":
+                progress.local += 1
+
+            # Parsed pages are no longer needed; keep only the chunks in the queue
+            item.docs = []
+            if not item.splits:
+                print(f"  -> No splits found for {item.filename}. Skipping DB save.")
+                progress.skipped += 1
+                continue
+            await chunk_queue.put(item)
+
+    async def _write_stage(self, chunk_queue: asyncio.Queue, progress: IngestProgress):
+        vectorstore = await asyncio.to_thread(get_vectorstore)
+
+        def on_flush(items: List[IngestItem], error: Optional[Exception]):
+            if error is not None:
+                progress.failed += len(items)
+                return
+            progress.written += len(items)
+            progress.chunks += sum(len(item.splits) for item in items)
+            if self.on_written is not None:
+                self.on_written(items)
+
+        buffer = VectorWriteBuffer(
+            lambda items: commit_items(vectorstore, self.manifest, items),
+            max_chunks=self.write_batch,
+            on_flush=on_flush
+        )
+        try:
+            while True:
+                item = await chunk_queue.get()
+                if item is _DONE:
+                    return
+                # add() flushes (embeds + writes) once the buffer is full
+                await asyncio.to_thread(buffer.add, item)
+        finally:
+            await asyncio.to_thread(buffer.close)
+
+    async def _report(self, progress: IngestProgress, parsed_queue: asyncio.Queue, chunk_queue: asyncio.Queue):
+        while True:
+            await asyncio.sleep(INGEST_PROGRESS_EVERY_S)
+            progress.report(parsed_queue.qsize(), chunk_queue.qsize())
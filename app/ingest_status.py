@@ -0,0 +1,26 @@
+"""
+Ingest daemon status file.
+Written by app.ingest_daemon, read by the API (/api/v1/ingest/status). Kept
+apart from the daemon so the API does not import the ingest stack.
+"""
+import json
+import os
+from typing import Optional
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INGEST_STATUS_PATH = os.getenv("INGEST_STATUS_PATH", os.path.join(base_dir, "ingest_status.json"))
+
+
+def write_status(status: dict, path: str = INGEST_STATUS_PATH):
+    # Atomic replace: the API never reads a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+
+
+def read_status(path: str = INGEST_STATUS_PATH) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,168 @@
+"""
+Disk-backed cache of LLM responses, used by app.llm_gateway.
+Keyed by stage, model parameters, prompt/chain shape and input; SQLite-backed
+and size-capped with LRU eviction. Only deterministic stages are cached by default.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumpd
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import RunnableBinding, RunnableSequence
+
+from app.refiner.cache import content_hash
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(base_dir, "llm_cache.sqlite"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+# Temperature-0 stages; explanations (temperature 0.2) have their own deep-dive cache
+LLM_CACHE_STAGES = {
+    stage.strip()
+    for stage in os.getenv(
+        "LLM_CACHE_STAGES",
+        "parse_jd,multi_query,ingest_extract,judge,judge_faithfulness,judge_relevancy"
+    ).split(",")
+    if stage.strip()
+}
+
+_MISS = object()
+
+
+def _signature(runnable) -> str:
+    """Stable description of what a runnable sends to the model (no object ids)."""
+    if isinstance(runnable, BaseChatModel):
+        return f"{type(runnable).__name__}({getattr(runnable, 'model', '')}, t={getattr(runnable, 'temperature', '')})"
+    if isinstance(runnable, RunnableSequence):
+        return " | ".join(_signature(step) for step in runnable.steps)
+    if isinstance(runnable, RunnableBinding):
+        kwargs = json.dumps(runnable.kwargs, sort_keys=True, default=str)
+        return f"{_signature(runnable.bound)}.bind({kwargs})"
+    if isinstance(runnable, BasePromptTemplate):
+        return repr(runnable)
+    schema = getattr(runnable, "pydantic_object", None)
+    if schema is not None:
+        return f"{type(runnable).__name__}[{schema.__name__}]"
+    return type(runnable).__name__
+
+
+def _serialize_input(input: Any) -> str:
+    if isinstance(input, str):
+        return input
+    return json.dumps(dumpd(input), sort_keys=True, default=str)
+
+
+def cache_key(stage: str, runnable, input: Any) -> str:
+    return content_hash(stage, _signature(runnable), _serialize_input(input))
+
+
+class LLMResponseCache:
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def get(self, key: str) -> Any:
+        """Cached response, or the module-level _MISS sentinel (None is a valid response)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM llm_responses WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return _MISS
+            self._conn.execute(
+                "UPDATE llm_responses SET last_access = ? WHERE cache_key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            # Response class changed since the entry was written
+            return _MISS
+
+    def put(self, key: str, stage: str, response: Any):
+        try:
+            payload = pickle.dumps(response)
+        except Exception as e:
+            print(f"[{stage}] LLM response not cacheable: {e}")
+            return
+
+        # A cache write failure must never fail the LLM call that produced the response
+        with self._lock:
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (cache_key, stage, payload, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, stage, payload, time.time())
+                )
+                self._size += cursor.rowcount
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[{stage}] LLM cache write failed: {e}")
+
+    def _evict(self):
+        if self._size <= self.max_entries:
+            return
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        excess = self._size - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE cache_key IN "
+                "(SELECT cache_key FROM llm_responses ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            self._size -= excess
+
+    def clear(self, stage: Optional[str] = None) -> int:
+        with self._lock:
+            if stage is None:
+                cursor = self._conn.execute("DELETE FROM llm_responses")
+            else:
+                cursor = self._conn.execute("DELETE FROM llm_responses WHERE stage = ?", (stage,))
+            self._conn.commit()
+            self._size = max(0, self._size - cursor.rowcount)
+            return cursor.rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache(stage: str) -> Optional[LLMResponseCache]:
+    """Shared cache instance, or None when caching is off globally or for this stage."""
+    global _cache
+
+    if not LLM_CACHE_ENABLED or stage not in LLM_CACHE_STAGES:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+    return _cache
+
+
+def is_miss(value: Any) -> bool:
+    return value is _MISS
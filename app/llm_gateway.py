@@ -0,0 +1,250 @@
+"""
+LLM Gateway
+Every Gemini call in the app goes through here:
+- shared chat model clients (one per model/temperature, reused connections)
+- a process-wide concurrency cap and request-rate token bucket across all stages
+- exponential backoff with jitter on 429 / transient errors
+- a deterministic offline backend for benchmarks (LLM_BACKEND=fake, app.fake_llm)
+- a disk-backed response cache for deterministic stages (app.llm_cache)
+- per-stage call, error, latency, token and cache hit counters
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.fake_llm import LLM_RECORD_PATH, STAGE_METADATA_KEY, FakeChatModel, ResponseRecorder
+from app.llm_cache import cache_key, get_llm_cache, is_miss
+from app.performance_monitor import span
+from app.rate_limit import ConcurrencyLimiter, TokenBucket, backoff_delay, is_rate_limit_error
+
+load_dotenv()
+
+# gemini | fake
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+
+_TRANSIENT_MARKERS = ("500", "503", "unavailable", "deadline exceeded", "internal error")
+
+
+def is_retryable_error(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return is_rate_limit_error(error) or any(marker in text for marker in _TRANSIENT_MARKERS)
+
+
+def get_api_key() -> str:
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("Missing GOOGLE_API_KEY in environment")
+    return api_key
+
+
+# =====================================================
+# Per-stage accounting
+# =====================================================
+
+class StageStats:
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latency_s = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_latency_s": round(self.latency_s / self.calls, 3) if self.calls else 0.0,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_stats: Dict[str, StageStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(stage: str, **deltas):
+    with _stats_lock:
+        stats = _stats.setdefault(stage, StageStats())
+        for name, value in deltas.items():
+            setattr(stats, name, getattr(stats, name) + value)
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        return {stage: stats.as_dict() for stage, stats in _stats.items()}
+
+
+class _UsageCallback(BaseCallbackHandler):
+    """Collects Gemini token usage from every LLM run inside a gateway call."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                _record(
+                    self.stage,
+                    input_tokens=usage.get("input_tokens", 0),
+                    output_tokens=usage.get("output_tokens", 0)
+                )
+
+
+# =====================================================
+# Shared clients
+# =====================================================
+
+_clients: Dict[tuple, BaseChatModel] = {}
+_clients_lock = threading.Lock()
+
+
+def llm_available() -> bool:
+    """False when the live backend is selected but no API key is configured."""
+    return LLM_BACKEND == "fake" or bool(os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"))
+
+
+def _build_chat_model(model: str, temperature: float) -> BaseChatModel:
+    if LLM_BACKEND == "fake":
+        return FakeChatModel(model=f"fake-{model}", temperature=temperature)
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=get_api_key(),
+        temperature=temperature,
+        max_retries=0
+    )
+
+
+def get_chat_model(temperature: float = 0.0, model: str = DEFAULT_MODEL) -> BaseChatModel:
+    """
+    Shared chat model: stages with the same model and temperature share one
+    client (per-stage accounting happens in invoke / ainvoke). Retries are
+    disabled on the client because the gateway owns them.
+    """
+    key = (model, temperature)
+    if key not in _clients:
+        with _clients_lock:
+            if key not in _clients:
+                _clients[key] = _build_chat_model(model, temperature)
+    return _clients[key]
+
+
+# =====================================================
+# Global limits
+# =====================================================
+
+rate_limiter = TokenBucket(GEMINI_REQUESTS_PER_MINUTE)
+# Shared by sync threads and async callers (FIFO across both)
+_concurrency = ConcurrencyLimiter(LLM_MAX_CONCURRENCY)
+
+
+# =====================================================
+# Invocation
+# =====================================================
+
+_recorder = ResponseRecorder(LLM_RECORD_PATH) if LLM_RECORD_PATH and LLM_BACKEND != "fake" else None
+
+
+def _config(stage: str, config: Optional[dict]) -> dict:
+    config = dict(config or {})
+    callbacks = list(config.get("callbacks") or []) + [_UsageCallback(stage)]
+    if _recorder is not None:
+        callbacks.append(_recorder)
+    config["callbacks"] = callbacks
+    # The fake backend picks per-stage canned responses from this
+    config["metadata"] = {**(config.get("metadata") or {}), STAGE_METADATA_KEY: stage}
+    return config
+
+
+def _cache_lookup(stage: str, runnable, input):
+    """Returns (cache, key, cached response or miss sentinel); cache is None when disabled."""
+    cache = get_llm_cache(stage)
+    if cache is None:
+        return None, None, None
+
+    key = cache_key(stage, runnable, input)
+    with span(f"cache.llm.{stage}"):
+        cached = cache.get(key)
+    if is_miss(cached):
+        _record(stage, cache_misses=1)
+    else:
+        _record(stage, cache_hits=1)
+    return cache, key, cached
+
+
+def invoke(stage: str, runnable, input, config: Optional[dict] = None, max_retries: int = LLM_MAX_RETRIES):
+    """Runs an LLM (or a chain containing one) under the global limits, with retries."""
+    cache, key, cached = _cache_lookup(stage, runnable, input)
+    if cache is not None and not is_miss(cached):
+        return cached
+
+    for attempt in range(max_retries + 1):
+        rate_limiter.acquire()
+        _concurrency.acquire()
+        start = time.perf_counter()
+        try:
+            with span(f"llm.{stage}"):
+                result = runnable.invoke(input, config=_config(stage, config))
+            _record(stage, calls=1, latency_s=time.perf_counter() - start)
+            if cache is not None:
+                cache.put(key, stage, result)
+            return result
+        except Exception as e:
+            _record(stage, calls=1, errors=1, latency_s=time.perf_counter() - start)
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            delay = backoff_delay(attempt)
+            _record(stage, retries=1)
+            print(f"[{stage}] LLM call failed ({e}), retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+        finally:
+            _concurrency.release()
+        time.sleep(delay)
+
+
+async def ainvoke(stage: str, runnable, input, config: Optional[dict] = None, max_retries: int = LLM_MAX_RETRIES):
+    cache, key, cached = _cache_lookup(stage, runnable, input)
+    if cache is not None and not is_miss(cached):
+        return cached
+
+    for attempt in range(max_retries + 1):
+        await rate_limiter.aacquire()
+        await _concurrency.aacquire()
+        start = time.perf_counter()
+        try:
+            with span(f"llm.{stage}"):
+                result = await runnable.ainvoke(input, config=_config(stage, config))
+            _record(stage, calls=1, latency_s=time.perf_counter() - start)
+            if cache is not None:
+                cache.put(key, stage, result)
+            return result
+        except Exception as e:
+            _record(stage, calls=1, errors=1, latency_s=time.perf_counter() - start)
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            delay = backoff_delay(attempt)
+            _record(stage, retries=1)
+            print(f"[{stage}] LLM call failed ({e}), retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+        finally:
+            _concurrency.release()
+        await asyncio.sleep(delay)
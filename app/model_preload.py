@@ -0,0 +1,36 @@
+"""
+Model preloading.
+With PRELOAD_MODELS=true, importing app.server loads the embedding model and
+the cross-encoders up front instead of on the first request. Under the
+pre-fork launcher (python -m app.serve) that import happens once in the
+parent, so the weights are shared copy-on-write by every worker; each worker
+then warms up (one tiny inference, vector store connection) before it
+accepts requests, so the first request does not pay for it.
+"""
+import os
+
+from app.refiner.evaluator import EVALUATOR_BACKEND
+from app.refiner.nli_evaluator import get_nli_model
+from app.refiner.reranker import get_cross_encoder
+from app.vector_store import get_embedding_model, get_vectorstore
+
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "false").lower() == "true"
+
+
+def preload_models():
+    """Loads model weights only. No inference and no store connections: this may run before fork."""
+    get_embedding_model()
+    get_cross_encoder()
+    if EVALUATOR_BACKEND == "nli":
+        get_nli_model()
+    print("Models preloaded")
+
+
+def warm_up():
+    """Per worker, after fork: opens the vector store and runs each model once."""
+    get_vectorstore()
+    get_embedding_model().embed_query("warm up")
+    get_cross_encoder().predict([("warm up", "warm up")])
+    if EVALUATOR_BACKEND == "nli":
+        get_nli_model().predict([("warm up", "warm up")])
+    print(f"Worker {os.getpid()} warmed up")
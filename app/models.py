@@ -1,4 +1,4 @@
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -46,6 +46,10 @@ class ExplainabilityAnalysis(BaseModel):
         default_factory=list,
         description="Detailed skill extraction with evidence"
     )
+    requirements_comparison: List[RequirementEvidence] = Field(
+        default_factory=list,
+        description="Requirement-by-requirement evaluation"
+    )
     required_skills: List[str] = Field(default_factory=list, description="List of required skills")
     seniority_level: Optional[str] = Field(
         default=None,
@@ -60,6 +64,37 @@ class ExplainabilityAnalysis(BaseModel):
     )
 
 
+# ---------- Batched Explanations (structured LLM output) ----------
+
+class CandidateExplanation(BaseModel):
+    candidate_id: str = Field(..., description="candidate_id exactly as given in the prompt")
+    why_match_summary: str = Field(
+        ..., description="Brief explanation of why the candidate matches or does not match the role"
+    )
+    requirements_comparison: List[RequirementEvidence] = Field(
+        default_factory=list,
+        description="One entry per job requirement"
+    )
+
+
+class BatchedExplanations(BaseModel):
+    explanations: List[CandidateExplanation] = Field(
+        default_factory=list,
+        description="One explanation per candidate in the prompt"
+    )
+
+# ---------- Judge Scores (structured LLM output) ----------
+
+class JudgeScores(BaseModel):
+    faithfulness_score: float = Field(
+        ..., ge=0, le=1,
+        description="How well every claim in the explanation is supported by the CV evidence"
+    )
+    relevancy_score: float = Field(
+        ..., ge=0, le=1,
+        description="How relevant the explanation is to the job description"
+    )
+
    
 class MatchResult(BaseModel):
     candidate_id: str
@@ -102,6 +137,16 @@ class CandidateCard(BaseModel):
         description="Skills found in both JD and Candidate"
     )
 
+    skill_bitset: int = Field(
+        default=0, exclude=True,
+        description="Taxonomy skill IDs as a bitset (internal, for overlap scoring)"
+    )
+
+    duplicate_ids: List[str] = Field(
+        default_factory=list,
+        description="Other retrieved resume versions of the same person (near-duplicates)"
+    )
+
     ai_reasoning_short: str = Field(
         ..., description="Short AI-generated justification (UI-safe)"
     )
@@ -114,20 +159,25 @@ class CandidateDeepDive(BaseModel):
 
     explainability: ExplainabilityAnalysis
 
-    faithfulness_score: float = Field(
-        ..., ge=0, le=1,
-        description="How grounded the explanation is in the CV evidence"
+    faithfulness_score: Optional[float] = Field(
+        None, ge=0, le=1,
+        description="How grounded the explanation is in the CV evidence (None if not judged inline)"
     )
 
-    relevancy_score: float = Field(
-        ..., ge=0, le=1,
-        description="How relevant the explanation is to the job description"
+    relevancy_score: Optional[float] = Field(
+        None, ge=0, le=1,
+        description="How relevant the explanation is to the job description (None if not judged inline)"
     )
 
     is_trustworthy: bool = Field(
         ..., description="Passed faithfulness & relevancy thresholds"
     )
 
+    missing: List[Literal["explanation", "evaluation"]] = Field(
+        default_factory=list,
+        description="Parts skipped because the request latency budget ran out"
+    )
+
 
 # ---------- API Responses ----------
 
@@ -157,8 +207,15 @@ class MatchResult(BaseModel):
     skills_match: List[str] = Field(default_factory=list, description="Skills matched between JD and candidate")
     reasoning: Optional[str] = Field(None, description="AI generated reasoning / short justification")
     faithfulness_score: Optional[float] = Field(None, ge=0, le=1, description="Faithfulness of reasoning to CV/evidence")
+    missing: List[Literal["explanation", "evaluation"]] = Field(
+        default_factory=list,
+        description="Parts skipped because the request latency budget ran out"
+    )
 
 
 class MatchResponse(BaseModel):
     total_candidates: int
     top_matches: List[MatchResult]
+    timings: Optional[Dict[str, float]] = Field(
+        None, description="Per-stage milliseconds (only with ?include_timings=true)"
+    )
@@ -1,7 +1,6 @@
 from app.models import JobDescription, JobDescriptionRequest
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langsmith import traceable
-import os
+from app import llm_gateway
 
 @traceable(name="Parse_JD_Task", run_type="parser")
 def parse_job_description_request(request: JobDescriptionRequest) -> JobDescription:
@@ -10,9 +9,8 @@ def parse_job_description_request(request: JobDescriptionRequest) -> JobDescript
     JobDescription object using Gemini's structured output capabilities.
     """
     
-    # 1. Initialize LLM (Using 1.5-flash for speed and reliable extraction)
-    # Note: 'gemini-2.0-flash' can also be used if available in your region.
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+    # 1. Shared LLM client from the gateway (no per-call client construction)
+    llm = llm_gateway.get_chat_model(temperature=0)
     
     # 2. Bind the LLM to your Pydantic model
     # This forces the AI to return data in the exact format of your JobDescription class
@@ -33,7 +31,7 @@ def parse_job_description_request(request: JobDescriptionRequest) -> JobDescript
         full_prompt = f"{instruction}\n\nJob Description Text:\n{request.description}"
         
         # Invoke the structured LLM
-        structured_jd = structured_llm.invoke(full_prompt)
+        structured_jd = llm_gateway.invoke("parse_jd", structured_llm, full_prompt)
         
         # Ensure the description field is populated with the original text if LLM misses it
         if not structured_jd.description:
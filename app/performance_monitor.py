@@ -1,7 +1,12 @@
 import time
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Dict, List, Optional
 import asyncio
+import contextvars
+import json
+import os
+import threading
+from contextlib import contextmanager
 
 def timing_decorator(func: Callable) -> Callable:
     """Decorator to measure execution time of functions"""
@@ -54,4 +59,123 @@ class PerformanceMonitor:
             print(f"{name}: {avg_value:.2f}s avg over {count} calls")
 
 # Global performance monitor instance
-perf_monitor = PerformanceMonitor()
\ No newline at end of file
+perf_monitor = PerformanceMonitor()
+
+# =====================================================
+# Per-request tracing (Server-Timing / trace export)
+# =====================================================
+
+# Chrome trace-event JSON (open in chrome://tracing or ui.perfetto.dev); unset = disabled
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+
+class RequestTrace:
+    """Spans recorded for one request, from any thread or task that inherited its context."""
+
+    def __init__(self, name: str = "request"):
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.wall_started_at = time.time()
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, duration: float, attrs: Optional[dict] = None):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start": start,
+                "duration": duration,
+                "thread": threading.get_ident(),
+                "attrs": attrs or {},
+            })
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Total milliseconds per span name (concurrent spans are summed)."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for s in self.spans:
+                totals[s["name"]] = totals.get(s["name"], 0.0) + s["duration"] * 1000
+        return {name: round(ms, 1) for name, ms in totals.items()}
+
+    def server_timing(self) -> str:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for s in self.spans:
+                counts[s["name"]] = counts.get(s["name"], 0) + 1
+        return ", ".join(
+            f'{name};desc="{counts[name]}x";dur={ms}' if counts[name] > 1 else f"{name};dur={ms}"
+            for name, ms in self.stage_totals().items()
+        )
+
+    def to_trace_events(self) -> List[dict]:
+        pid = os.getpid()
+        with self._lock:
+            return [
+                {
+                    "name": s["name"],
+                    "ph": "X",
+                    "ts": (self.wall_started_at + (s["start"] - self.started_at)) * 1e6,
+                    "dur": s["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": s["thread"],
+                    "args": {"request": self.name, **s["attrs"]},
+                }
+                for s in self.spans
+            ]
+
+
+current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Times a block into the current request trace (no-op outside a traced request)."""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter() - start, attrs)
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_trace_file_lock = threading.Lock()
+
+
+def export_trace(trace: RequestTrace, path: Optional[str] = TRACE_FILE):
+    """
+    Appends the trace to a Chrome JSON-array trace file. The format allows the
+    closing bracket to be omitted, so the file can be appended to indefinitely.
+    """
+    if not path:
+        return
+    events = trace.to_trace_events()
+    if not events:
+        return
+    with _trace_file_lock:
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", encoding="utf-8") as f:
+            if new_file:
+                f.write("[\n")
+            for event in events:
+                f.write(json.dumps(event) + ",\n")
@@ -0,0 +1,113 @@
+"""
+Candidate profile store.
+One normalized, pre-parsed row per candidate (name, title, years, skills,
+skill bitset) in SQLite. Vector store chunks only carry candidate_id and a
+chunk ordinal; search hydrates profiles with one bulk lookup per request.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from app.skill_taxonomy import bits_to_hex, taxonomy
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_STORE_PATH = os.getenv("PROFILE_STORE_PATH", os.path.join(base_dir, "candidate_profiles.sqlite"))
+
+# SQLite's default limit on bound parameters per statement
+_MAX_PARAMS = 900
+
+_COLUMNS = ("candidate_id", "name", "title", "years_experience", "summary", "skills", "skill_bitset", "source")
+
+
+def profile_from_metadata(meta_data: dict) -> dict:
+    """Normalizes ingest metadata (LLM extraction output) into a profile row."""
+    skills = [str(s).strip() for s in meta_data.get("top_skills") or [] if str(s).strip()]
+    years = meta_data.get("years_of_experience")
+    return {
+        "candidate_id": str(meta_data["candidate_id"]),
+        "name": meta_data.get("name") or "",
+        "title": meta_data.get("job_title") or "Unknown",
+        "years_experience": float(years) if isinstance(years, (int, float)) else 0.0,
+        "summary": meta_data.get("summary") or "",
+        "skills": skills,
+        "skill_bitset": meta_data.get("skill_bitset") or bits_to_hex(taxonomy.encode(skills, add=True)),
+        "source": meta_data.get("source") or "",
+    }
+
+
+class ProfileStore:
+
+    def __init__(self, path: str = PROFILE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS profiles (
+                candidate_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                title TEXT NOT NULL,
+                years_experience REAL NOT NULL,
+                summary TEXT NOT NULL,
+                skills TEXT NOT NULL,
+                skill_bitset TEXT NOT NULL,
+                source TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def upsert_many(self, profiles: List[dict]):
+        rows = [
+            tuple(json.dumps(p[c]) if c == "skills" else p[c] for c in _COLUMNS) + (time.time(),)
+            for p in profiles
+        ]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO profiles ({', '.join(_COLUMNS)}, updated_at) "
+                f"VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})",
+                rows
+            )
+            self._conn.commit()
+
+    def get_many(self, candidate_ids: Iterable[str]) -> Dict[str, dict]:
+        ids = list(dict.fromkeys(str(cid) for cid in candidate_ids))
+        profiles = {}
+        with self._lock:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                batch = ids[start:start + _MAX_PARAMS]
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM profiles "
+                    f"WHERE candidate_id IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for row in rows:
+                    profile = dict(zip(_COLUMNS, row))
+                    profile["skills"] = json.loads(profile["skills"])
+                    profiles[profile["candidate_id"]] = profile
+        return profiles
+
+    def get(self, candidate_id: str) -> Optional[dict]:
+        return self.get_many([candidate_id]).get(str(candidate_id))
+
+    def delete(self, candidate_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM profiles WHERE candidate_id = ?", (str(candidate_id),))
+            self._conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProfileStore()
+    return _store
@@ -0,0 +1,123 @@
+"""
+Rate limiting and backoff helpers for Gemini calls (used by app.llm_gateway).
+Usable from both threads (sync callers) and the asyncio server path.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every caller in the process.
+    `rate_per_minute` tokens are refilled continuously up to `capacity`.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 6)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes one token (possibly going into debt) and returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` holders at a time across threads and event loops. Waiters
+    are served in arrival order, whether they are sync or async, and are woken
+    by release() rather than polling.
+    """
+
+    def __init__(self, limit: int):
+        self._available = max(1, limit)
+        # threading.Event (sync waiter) or (loop, future) (async waiter)
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        # release() hands its slot straight to us
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            if waiter[1].done() and not waiter[1].cancelled():
+                # The slot was handed over, then the task was cancelled before it resumed
+                self.release()
+            # Otherwise the slot is still in flight and _hand_over passes it on
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    # The waiter's event loop is closed
+                    continue
+            self._available += 1
+
+    def _hand_over(self, future: asyncio.Future):
+        if future.done():
+            # Cancelled while the slot was in flight
+            self.release()
+        else:
+            future.set_result(None)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Gemini surfaces quota errors as 429 / RESOURCE_EXHAUSTED depending on transport."""
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in ("429", "resource_exhausted", "resourceexhausted", "rate limit", "quota"))
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 30.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
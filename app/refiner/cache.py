@@ -0,0 +1,127 @@
+"""
+Persistent cache of CandidateDeepDive results (explanations and judge scores).
+SQLite-backed, size-capped with LRU eviction, invalidated per candidate on re-ingest.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from app.models import CandidateCard, CandidateDeepDive
+
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_PATH = os.getenv("DEEP_DIVE_CACHE_PATH", os.path.join(base_dir, "deep_dive_cache.sqlite"))
+CACHE_MAX_ENTRIES = int(os.getenv("DEEP_DIVE_CACHE_MAX_ENTRIES", "10000"))
+CACHE_ENABLED = os.getenv("DEEP_DIVE_CACHE_ENABLED", "true").lower() == "true"
+
+
+def content_hash(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def profile_hash(candidate: CandidateCard) -> str:
+    """Hash of the profile fields the explainer sees (score is excluded on purpose)."""
+    return content_hash(
+        candidate.name,
+        candidate.current_title,
+        candidate.years_experience,
+        sorted(candidate.skills_match)
+    )
+
+
+class DeepDiveCache:
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS deep_dives (
+                cache_key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                candidate_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_deep_dives_candidate ON deep_dives(candidate_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_deep_dives_access ON deep_dives(last_access)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM deep_dives").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CandidateDeepDive]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM deep_dives WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE deep_dives SET last_access = ? WHERE cache_key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+
+        try:
+            return CandidateDeepDive.model_validate_json(row[0])
+        except ValueError:
+            # Schema changed since the entry was written
+            return None
+
+    def put(self, key: str, stage: str, deep_dive: CandidateDeepDive):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO deep_dives (cache_key, stage, candidate_id, payload, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, stage, deep_dive.candidate_id, deep_dive.model_dump_json(), time.time())
+            )
+            self._size += cursor.rowcount
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._size <= self.max_entries:
+            return
+        self._size = self._conn.execute("SELECT COUNT(*) FROM deep_dives").fetchone()[0]
+        excess = self._size - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM deep_dives WHERE cache_key IN "
+                "(SELECT cache_key FROM deep_dives ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            self._size -= excess
+
+    def invalidate_candidate(self, candidate_id: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM deep_dives WHERE candidate_id = ?", (str(candidate_id),)
+            )
+            self._conn.commit()
+            self._size = max(0, self._size - cursor.rowcount)
+            return cursor.rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_deep_dive_cache() -> Optional[DeepDiveCache]:
+    """Shared cache instance, or None when DEEP_DIVE_CACHE_ENABLED=false."""
+    global _cache
+
+    if not CACHE_ENABLED:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DeepDiveCache()
+    return _cache
@@ -0,0 +1,40 @@
+"""
+Request-level latency budget for the hiring pipeline.
+The server creates one Deadline per request and passes it through the
+pipeline input as x["deadline"]; stages derive their own deadlines from it
+and return partial results instead of waiting past them.
+"""
+import os
+import time
+from typing import Optional
+
+PIPELINE_BUDGET_S = float(os.getenv("PIPELINE_BUDGET_S", "60"))
+# Explanations must be done by this share of the budget; the rest is for judging
+EXPLAIN_BUDGET_SHARE = float(os.getenv("EXPLAIN_BUDGET_SHARE", "0.75"))
+
+
+class Deadline:
+
+    def __init__(self, budget_s: float = PIPELINE_BUDGET_S, started_at: Optional[float] = None):
+        self.budget_s = budget_s
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self.expires_at = self.started_at + budget_s
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def at_share(self, share: float) -> "Deadline":
+        """Stage deadline at `share` of the request budget, measured from the request start."""
+        return Deadline(self.budget_s * share, started_at=self.started_at)
+
+
+def timeout_for(deadline: Optional[Deadline]) -> Optional[float]:
+    """Seconds left, or None (wait forever) when the caller set no deadline."""
+    return None if deadline is None else deadline.remaining()
+
+
+def is_expired(deadline: Optional[Deadline]) -> bool:
+    return deadline is not None and deadline.expired()
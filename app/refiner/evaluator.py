@@ -1,19 +1,32 @@
 import os
 import re
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 
-from app.models import CandidateDeepDive
+from app.models import CandidateDeepDive, JudgeScores
+from app import llm_gateway
+from app.refiner.cache import content_hash, get_deep_dive_cache
+from app.refiner.nli_evaluator import nli_faithfulness
 load_dotenv()
 
+# Bump when the judge prompts change so cached scores are not reused
+JUDGE_VERSION = "judge-v2"
+
+# "combined": one structured call returning both scores
+# "separate": one free-text call per metric
+JUDGE_MODE = os.getenv("JUDGE_MODE", "combined")
+
+# "llm": Gemini judge (JUDGE_MODE decides combined or separate calls)
+# "nli": opt-in; faithfulness from a local NLI cross-encoder (milliseconds).
+#        Relevancy still costs one Gemini call per candidate (evaluate_relevancy):
+#        relevancy_threshold is calibrated for that judge, not for a local score
+EVALUATOR_BACKEND = os.getenv("EVALUATOR_BACKEND", "llm")
+
 
 # --- Gemini Judge ---
-judge_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=os.environ["GOOGLE_API_KEY"],
-    temperature=0.0
-)
+judge_llm = llm_gateway.get_chat_model(temperature=0.0)
+
+combined_judge_llm = judge_llm.with_structured_output(JudgeScores)
 
 
 # -------------------------
@@ -61,7 +74,7 @@ EXPLANATION:
 {explanation}
 """
 
-    response = judge_llm.invoke([HumanMessage(content=prompt)])
+    response = llm_gateway.invoke("judge_faithfulness", judge_llm, [HumanMessage(content=prompt)])
     return extract_score(response.content)
 
 
@@ -89,10 +102,71 @@ EXPLANATION:
 {explanation}
 """
 
-    response = judge_llm.invoke([HumanMessage(content=prompt)])
+    response = llm_gateway.invoke("judge_relevancy", judge_llm, [HumanMessage(content=prompt)])
     return extract_score(response.content)
 
 
+# -------------------------
+# Combined (single call)
+# -------------------------
+def evaluate_combined(
+    explanation: str,
+    description: str,
+    cv_evidence: str
+) -> JudgeScores:
+
+    prompt = f"""
+You are an impartial evaluator.
+
+TASK:
+Score the explanation on two metrics, each between 0.0 and 1.0.
+
+FAITHFULNESS:
+- Every claim is supported by the CV evidence.
+
+RELEVANCY:
+- The explanation addresses the job description.
+
+JOB DESCRIPTION:
+{description}
+
+CV EVIDENCE:
+{cv_evidence}
+
+EXPLANATION:
+{explanation}
+"""
+
+    return llm_gateway.invoke("judge", combined_judge_llm, [HumanMessage(content=prompt)])
+
+
+def _judge(
+    explanation: str,
+    description: str,
+    cv_evidence: str,
+    judge_mode: str
+) -> tuple:
+
+    if judge_mode == "combined":
+        try:
+            scores = evaluate_combined(explanation, description, cv_evidence)
+            return scores.faithfulness_score, scores.relevancy_score
+        except Exception as e:
+            print(f"Combined judge failed, falling back to separate calls: {e}")
+
+    faithfulness = evaluate_faithfulness(
+        explanation,
+        cv_evidence
+    )
+
+    relevancy = evaluate_relevancy(
+        explanation,
+        description
+    )
+
+    return faithfulness, relevancy
+
+
 # -------------------------
 # Full Candidate Evaluation
 # -------------------------
@@ -101,27 +175,57 @@ def evaluate_candidate(
     description: str,
     cv_evidence: str,
     faithfulness_threshold: float = 0.75,
-    relevancy_threshold: float = 0.70
+    relevancy_threshold: float = 0.70,
+    judge_mode: str = None,
+    backend: str = None
 ) -> CandidateDeepDive:
 
+    judge_mode = judge_mode or JUDGE_MODE
+    backend = backend or EVALUATOR_BACKEND
+
     explanation_text = deep_dive.explainability.why_match_summary
 
-    faithfulness = evaluate_faithfulness(
-        explanation_text,
-        cv_evidence
+    cache = get_deep_dive_cache()
+    cache_key = content_hash(
+        "judge",
+        JUDGE_VERSION,
+        backend,
+        judge_mode if backend == "llm" else "",
+        judge_llm.model,
+        content_hash(description),
+        deep_dive.candidate_id,
+        content_hash(cv_evidence),
+        content_hash(explanation_text)
     )
 
-    relevancy = evaluate_relevancy(
-        explanation_text,
-        description
-    )
+    cached = cache.get(cache_key) if cache is not None else None
+
+    if cached is not None:
+        faithfulness = cached.faithfulness_score
+        relevancy = cached.relevancy_score
+    elif backend == "nli":
+        faithfulness = nli_faithfulness(explanation_text, cv_evidence)
+        relevancy = evaluate_relevancy(explanation_text, description)
+    else:
+        faithfulness, relevancy = _judge(
+            explanation_text,
+            description,
+            cv_evidence,
+            judge_mode
+        )
 
     deep_dive.faithfulness_score = faithfulness
     deep_dive.relevancy_score = relevancy
 
+    # A missing score (nothing to check) never passes
     deep_dive.is_trustworthy = (
-        faithfulness >= faithfulness_threshold
+        faithfulness is not None
+        and relevancy is not None
+        and faithfulness >= faithfulness_threshold
         and relevancy >= relevancy_threshold
     )
 
+    if cache is not None and cached is None:
+        cache.put(cache_key, "judge", deep_dive)
+
     return deep_dive
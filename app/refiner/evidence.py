@@ -0,0 +1,89 @@
+"""
+Per-candidate evidence store.
+Keeps the resume chunks search already retrieved, grouped by candidate_id,
+and hands the explainer / evaluator a compact, token-budgeted evidence pack
+per candidate instead of the whole candidate list.
+"""
+import os
+from typing import Dict, List, Optional
+
+from app.performance_monitor import span
+from app.vector_store import get_vectorstore
+
+# Rough budget per candidate; ~4 chars per token for English resume text
+EVIDENCE_TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "600"))
+CHARS_PER_TOKEN = 4
+LOOKUP_K = int(os.getenv("EVIDENCE_LOOKUP_K", "3"))
+
+
+class EvidenceStore:
+
+    def __init__(self):
+        self._chunks: Dict[str, List[str]] = {}
+
+    def add(self, candidate_id: str, text: str):
+        text = (text or "").strip()
+        if not text:
+            return
+        chunks = self._chunks.setdefault(str(candidate_id), [])
+        if text not in chunks:
+            chunks.append(text)
+
+    def add_search_results(self, results: List[dict]):
+        """Search results are already in relevance order; that order is kept."""
+        for idx, res in enumerate(results):
+            meta = res.get("metadata", {}) or {}
+            # Same fallback ID as search_pipeline_to_candidates
+            self.add(meta.get("candidate_id", idx), res.get("content", ""))
+
+    def chunks(self, candidate_id: str) -> List[str]:
+        return self._chunks.get(str(candidate_id), [])
+
+    def lookup(self, candidate_id: str, query: str, k: int = LOOKUP_K) -> List[str]:
+        """candidate_id-filtered vector lookup for candidates search returned no chunks for."""
+        try:
+            with span("vector.evidence_lookup"):
+                docs = get_vectorstore().similarity_search(
+                    query, k=k, filter={"candidate_id": str(candidate_id)}
+                )
+        except Exception as e:
+            print(f"Evidence lookup failed for {candidate_id}: {e}")
+            return []
+
+        for doc in docs:
+            self.add(candidate_id, doc.page_content)
+        return self.chunks(candidate_id)
+
+    def pack(
+        self,
+        candidate_id: str,
+        query: Optional[str] = None,
+        token_budget: int = EVIDENCE_TOKEN_BUDGET
+    ) -> str:
+        chunks = self.chunks(candidate_id)
+        if not chunks and query:
+            chunks = self.lookup(candidate_id, query)
+
+        budget = token_budget * CHARS_PER_TOKEN
+        packed = []
+        used = 0
+        for chunk in chunks:
+            remaining = budget - used
+            if remaining <= 0:
+                break
+            piece = chunk[:remaining]
+            packed.append(piece)
+            used += len(piece)
+
+        return "\n---\n".join(packed)
+
+    def packs(
+        self,
+        candidate_ids: List[str],
+        query: Optional[str] = None,
+        token_budget: int = EVIDENCE_TOKEN_BUDGET
+    ) -> Dict[str, str]:
+        return {
+            str(cid): self.pack(cid, query=query, token_budget=token_budget)
+            for cid in candidate_ids
+        }
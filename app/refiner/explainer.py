@@ -1,10 +1,16 @@
+import asyncio
+import contextvars
 import os
-from typing import List
-from langchain_google_genai import ChatGoogleGenerativeAI
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 
+from app import llm_gateway
+from app.refiner.cache import content_hash, get_deep_dive_cache, profile_hash
+from app.skill_taxonomy import taxonomy
 from app.models import (
+    BatchedExplanations,
     CandidateCard,
     CandidateDeepDive,
     ExplainabilityAnalysis,
@@ -16,27 +22,41 @@ from app.models import (
 # ------------------ LLM ------------------
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=os.environ["GOOGLE_API_KEY"],
-    temperature=0.2
-)
+llm = llm_gateway.get_chat_model(temperature=0.2)
 
+# Bump when the prompts change so cached explanations are not reused
+PROMPT_VERSION = "explain-v2"
 
-# ------------------ Core Function ------------------
+# ------------------ Concurrency ------------------
+# Max candidates explained at once; the Gemini quota itself is enforced by the gateway
+MAX_CONCURRENCY = int(os.getenv("EXPLAINER_MAX_CONCURRENCY", "5"))
 
-def generate_explanations(
-    description: str,
-    job_requirements: List[str],
-    candidates: List[CandidateCard]
-) -> List[CandidateDeepDive]:
+# "per_candidate": one prompt per candidate
+# "batched": several candidates per prompt, JD sent once, structured output
+EXPLAINER_MODE = os.getenv("EXPLAINER_MODE", "per_candidate")
+PACK_SIZE = int(os.getenv("EXPLAINER_PACK_SIZE", "5"))
 
-    results: List[CandidateDeepDive] = []
+batched_llm = llm.with_structured_output(BatchedExplanations)
 
-    for candidate in candidates:
 
-        # -------- Prompt --------
-        prompt = f"""
+# ------------------ Helpers ------------------
+
+def _evidence_section(candidate: CandidateCard, evidence: Optional[Dict[str, str]]) -> str:
+    if evidence is None:
+        return ""
+    return f"""
+CV Evidence:
+{evidence.get(candidate.candidate_id) or "No resume excerpts available"}
+"""
+
+
+def _build_prompt(
+    description: str,
+    job_requirements: List[str],
+    candidate: CandidateCard,
+    evidence: Optional[Dict[str, str]] = None
+) -> str:
+    return f"""
 You are an AI hiring assistant.
 
 STRICT RULES:
@@ -55,63 +75,362 @@ Name: {candidate.name}
 Current Title: {candidate.current_title}
 Years of Experience: {candidate.years_experience}
 Skills: {candidate.skills_match}
-
+{_evidence_section(candidate, evidence)}
 TASK:
 Explain briefly why this candidate matches or does not match the role.
 """
 
-        response = llm.invoke([HumanMessage(content=prompt)])
-        explanation_text = response.content
 
-        # -------- Identified Skills --------
-        identified_skills = [
-            IdentifiedSkill(
-                skill=skill,
-                evidence="Explicitly listed in candidate CV"
-            )
-            for skill in candidate.skills_match
-        ]
+def _build_batched_prompt(
+    description: str,
+    job_requirements: List[str],
+    candidates: List[CandidateCard],
+    evidence: Optional[Dict[str, str]] = None
+) -> str:
+    candidate_blocks = "\n".join(
+        f"""
+candidate_id: {c.candidate_id}
+Name: {c.name}
+Current Title: {c.current_title}
+Years of Experience: {c.years_experience}
+Skills: {c.skills_match}
+{_evidence_section(c, evidence)}"""
+        for c in candidates
+    )
 
-        # -------- Requirements Comparison --------
-        candidate_skill_names = {
-            skill.lower() for skill in candidate.skills_match
-        }
+    return f"""
+You are an AI hiring assistant.
 
-        requirements_comparison: List[RequirementEvidence] = []
+STRICT RULES:
+- Use ONLY the provided information
+- Do NOT assume missing skills
+- If evidence does not exist, say so explicitly
+- Judge every candidate independently
 
-        for requirement in job_requirements:
+JOB DESCRIPTION:
+{description}
 
-            if requirement.lower() in candidate_skill_names:
-                status = "met"
-                evidence = "Skill explicitly present in CV"
-            else:
-                status = "not_met"
-                evidence = "No evidence found in CV"
+JOB REQUIREMENTS:
+{job_requirements}
 
-            requirements_comparison.append(
-                RequirementEvidence(
-                    requirement=requirement,
-                    candidate_evidence=evidence,
-                    status=status
-                )
-            )
+CANDIDATES:
+{candidate_blocks}
+
+TASK:
+For EACH candidate, return its candidate_id, a brief explanation of why it
+matches or does not match the role, and a met / partial / not_met status
+with evidence for every job requirement.
+"""
 
-        # -------- Explainability Object --------
-        explainability = ExplainabilityAnalysis(
-            why_match_summary=explanation_text,
-            identified_skills=identified_skills,
-            requirements_comparison=requirements_comparison
+
+def _build_deep_dive(
+    job_requirements: List[str],
+    candidate: CandidateCard,
+    explanation_text: str,
+    llm_requirements: Optional[List[RequirementEvidence]] = None
+) -> CandidateDeepDive:
+
+    # -------- Identified Skills --------
+    identified_skills = [
+        IdentifiedSkill(
+            skill=skill,
+            evidence="Explicitly listed in candidate CV"
         )
+        for skill in candidate.skills_match
+    ]
+
+    # -------- Requirements Comparison --------
+    # Synonym/casing-aware: "JS" meets "JavaScript" via the taxonomy IDs
+    candidate_bits = candidate.skill_bitset or taxonomy.encode(candidate.skills_match)
 
-        # -------- Deep Dive --------
-        deep_dive = CandidateDeepDive(
-            candidate_id=candidate.candidate_id,
-            explainability=explainability,
-            relevancy_score=0.0,
-            faithfulness_score=0.0,
-            is_trustworthy=False
+    requirements_comparison: List[RequirementEvidence] = []
+
+    for requirement in job_requirements:
+
+        if taxonomy.has_skill(candidate_bits, requirement):
+            status = "met"
+            evidence = "Skill explicitly present in CV"
+        else:
+            status = "not_met"
+            evidence = "No evidence found in CV"
+
+        requirements_comparison.append(
+            RequirementEvidence(
+                requirement=requirement,
+                candidate_evidence=evidence,
+                status=status
+            )
         )
 
-        results.append(deep_dive)
+    # Prefer the model's statuses when it covered every requirement
+    if llm_requirements and len(llm_requirements) == len(job_requirements):
+        requirements_comparison = llm_requirements
+
+    # -------- Explainability Object --------
+    explainability = ExplainabilityAnalysis(
+        why_match_summary=explanation_text,
+        identified_skills=identified_skills,
+        requirements_comparison=requirements_comparison
+    )
+
+    # -------- Deep Dive --------
+    return CandidateDeepDive(
+        candidate_id=candidate.candidate_id,
+        explainability=explainability,
+        relevancy_score=None,
+        faithfulness_score=None,
+        is_trustworthy=False
+    )
+
+
+def explain_candidate(
+    description: str,
+    job_requirements: List[str],
+    candidate: CandidateCard,
+    evidence: Optional[Dict[str, str]] = None
+) -> CandidateDeepDive:
+
+    prompt = _build_prompt(description, job_requirements, candidate, evidence)
+
+    response = llm_gateway.invoke("explain", llm, [HumanMessage(content=prompt)])
+    return _build_deep_dive(job_requirements, candidate, response.content)
+
+
+async def aexplain_candidate(
+    description: str,
+    job_requirements: List[str],
+    candidate: CandidateCard,
+    evidence: Optional[Dict[str, str]] = None
+) -> CandidateDeepDive:
+
+    prompt = _build_prompt(description, job_requirements, candidate, evidence)
+
+    response = await llm_gateway.ainvoke("explain", llm, [HumanMessage(content=prompt)])
+    return _build_deep_dive(job_requirements, candidate, response.content)
+
+
+def _unpack_batch(
+    job_requirements: List[str],
+    candidates: List[CandidateCard],
+    batch: Optional[BatchedExplanations]
+) -> tuple:
+    """Returns (deep dives by candidate_id, candidates the batch did not cover)."""
+    by_id = {
+        e.candidate_id: e for e in (batch.explanations if batch else [])
+    }
+
+    deep_dives = {}
+    missing = []
+
+    for candidate in candidates:
+        explanation = by_id.get(candidate.candidate_id)
+        if explanation is None or not explanation.why_match_summary:
+            missing.append(candidate)
+            continue
+        deep_dives[candidate.candidate_id] = _build_deep_dive(
+            job_requirements,
+            candidate,
+            explanation.why_match_summary,
+            explanation.requirements_comparison
+        )
+
+    return deep_dives, missing
+
+
+def explain_pack(
+    description: str,
+    job_requirements: List[str],
+    candidates: List[CandidateCard],
+    evidence: Optional[Dict[str, str]] = None
+) -> List[CandidateDeepDive]:
+
+    prompt = _build_batched_prompt(description, job_requirements, candidates, evidence)
+
+    try:
+        batch = llm_gateway.invoke("explain_batch", batched_llm, [HumanMessage(content=prompt)])
+    except Exception as e:
+        print(f"Batched explanation failed, falling back to per-candidate: {e}")
+        batch = None
+
+    deep_dives, missing = _unpack_batch(job_requirements, candidates, batch)
+
+    # Per-candidate fallback for anything the batch dropped or mangled
+    for candidate in missing:
+        deep_dives[candidate.candidate_id] = explain_candidate(description, job_requirements, candidate, evidence)
+
+    return [deep_dives[c.candidate_id] for c in candidates]
+
+
+async def aexplain_pack(
+    description: str,
+    job_requirements: List[str],
+    candidates: List[CandidateCard],
+    evidence: Optional[Dict[str, str]] = None
+) -> List[CandidateDeepDive]:
+
+    prompt = _build_batched_prompt(description, job_requirements, candidates, evidence)
+
+    try:
+        batch = await llm_gateway.ainvoke("explain_batch", batched_llm, [HumanMessage(content=prompt)])
+    except Exception as e:
+        print(f"Batched explanation failed, falling back to per-candidate: {e}")
+        batch = None
+
+    deep_dives, missing = _unpack_batch(job_requirements, candidates, batch)
+
+    fallbacks = await asyncio.gather(
+        *(aexplain_candidate(description, job_requirements, c, evidence) for c in missing)
+    )
+    for candidate, deep_dive in zip(missing, fallbacks):
+        deep_dives[candidate.candidate_id] = deep_dive
+
+    return [deep_dives[c.candidate_id] for c in candidates]
+
+
+def pack_candidates(candidates: List[CandidateCard], pack_size: int) -> List[List[CandidateCard]]:
+    pack_size = max(1, pack_size)
+    return [candidates[i:i + pack_size] for i in range(0, len(candidates), pack_size)]
+
+
+# ------------------ Cache ------------------
+
+def _cache_key(
+    description: str,
+    job_requirements: List[str],
+    candidate: CandidateCard,
+    evidence: Optional[Dict[str, str]] = None
+) -> str:
+    return content_hash(
+        "explain",
+        PROMPT_VERSION,
+        llm.model,
+        llm.temperature,
+        content_hash(description),
+        list(job_requirements),
+        candidate.candidate_id,
+        profile_hash(candidate),
+        content_hash(evidence.get(candidate.candidate_id, "")) if evidence is not None else ""
+    )
+
+
+def _split_cached(
+    description: str,
+    job_requirements: List[str],
+    candidates: List[CandidateCard],
+    evidence: Optional[Dict[str, str]] = None
+) -> tuple:
+    """Returns (cached deep dives by position, uncached candidates, their cache keys)."""
+    cache = get_deep_dive_cache()
+    if cache is None:
+        return {}, list(candidates), []
+
+    hits = {}
+    misses = []
+    keys = []
+    for idx, candidate in enumerate(candidates):
+        key = _cache_key(description, job_requirements, candidate, evidence)
+        deep_dive = cache.get(key)
+        if deep_dive is not None:
+            hits[idx] = deep_dive
+        else:
+            misses.append(candidate)
+            keys.append(key)
+    return hits, misses, keys
+
+
+def _merge_cached(
+    candidates: List[CandidateCard],
+    hits: dict,
+    keys: List[str],
+    generated: List[CandidateDeepDive]
+) -> List[CandidateDeepDive]:
+    cache = get_deep_dive_cache()
+    if cache is not None:
+        for key, deep_dive in zip(keys, generated):
+            cache.put(key, "explain", deep_dive)
+
+    fresh = iter(generated)
+    return [hits[idx] if idx in hits else next(fresh) for idx in range(len(candidates))]
+
+
+# ------------------ Core Function ------------------
+
+def generate_explanations(
+    description: str,
+    job_requirements: List[str],
+    candidates: List[CandidateCard],
+    max_concurrency: Optional[int] = None,
+    mode: Optional[str] = None,
+    pack_size: Optional[int] = None,
+    evidence: Optional[Dict[str, str]] = None
+) -> List[CandidateDeepDive]:
+
+    if not candidates:
+        return []
+
+    hits, misses, keys = _split_cached(description, job_requirements, candidates, evidence)
+    if not misses:
+        return _merge_cached(candidates, hits, keys, [])
+
+    if (mode or EXPLAINER_MODE) == "batched":
+        units = pack_candidates(misses, pack_size or PACK_SIZE)
+        run = lambda pack: explain_pack(description, job_requirements, pack, evidence)
+    else:
+        units = misses
+        run = lambda candidate: [explain_candidate(description, job_requirements, candidate, evidence)]
+
+    if len(units) == 1:
+        # Single candidate / pack (per-candidate fan-out): no pool needed
+        return _merge_cached(candidates, hits, keys, run(units[0]))
+
+    workers = max(1, min(max_concurrency or MAX_CONCURRENCY, len(units)))
+
+    # Contexts are copied here, in the caller, so worker spans land in the request trace
+    contexts = [contextvars.copy_context() for _ in units]
+
+    # executor.map preserves input order
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        generated = [
+            deep_dive
+            for chunk in executor.map(lambda ctx, unit: ctx.run(run, unit), contexts, units)
+            for deep_dive in chunk
+        ]
+
+    return _merge_cached(candidates, hits, keys, generated)
+
+
+async def agenerate_explanations(
+    description: str,
+    job_requirements: List[str],
+    candidates: List[CandidateCard],
+    max_concurrency: Optional[int] = None,
+    mode: Optional[str] = None,
+    pack_size: Optional[int] = None,
+    evidence: Optional[Dict[str, str]] = None
+) -> List[CandidateDeepDive]:
+
+    hits, misses, keys = _split_cached(description, job_requirements, candidates, evidence)
+    if not misses:
+        return _merge_cached(candidates, hits, keys, [])
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or MAX_CONCURRENCY))
+
+    if (mode or EXPLAINER_MODE) == "batched":
+        units = pack_candidates(misses, pack_size or PACK_SIZE)
+        run = lambda pack: aexplain_pack(description, job_requirements, pack, evidence)
+    else:
+        units = misses
+        run = lambda candidate: aexplain_candidate(description, job_requirements, candidate, evidence)
+
+    async def bounded(unit):
+        async with semaphore:
+            return await run(unit)
 
-    return results
+    # gather preserves input order
+    results = await asyncio.gather(*(bounded(u) for u in units))
+    generated = [
+        deep_dive
+        for result in results
+        for deep_dive in (result if isinstance(result, list) else [result])
+    ]
+    return _merge_cached(candidates, hits, keys, generated)
@@ -1,45 +1,54 @@
 from dotenv import load_dotenv
+import asyncio
+import contextvars
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from app.refiner.reranker import rerank_candidates
 from app.refiner.scorer import calculate_match_scores
-from app.refiner.explainer import generate_explanations
+from app.refiner.explainer import (
+    generate_explanations,
+    agenerate_explanations,
+    pack_candidates,
+    EXPLAINER_MODE,
+    MAX_CONCURRENCY,
+    PACK_SIZE
+)
 from app.refiner.evaluator import evaluate_candidate
+from app.refiner.deadline import EXPLAIN_BUDGET_SHARE, is_expired, timeout_for
+from app.refiner.evidence import EvidenceStore
+from app.models import CandidateDeepDive, ExplainabilityAnalysis
+from app.performance_monitor import span, traced
+from app.refiner.offline_eval import EVAL_MODE, offline_evaluator, new_request_id
 
 from app.search import combined_search_pipeline
 from app.search_adapter import search_pipeline_to_candidates
 
 load_dotenv()
 
-# =====================================================
-# LLM
-# =====================================================
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=os.environ["GOOGLE_API_KEY"],
-    temperature=0.2
-)
-
 # =====================================================
 # BLOCK 0 — SEARCH
 # =====================================================
 
-search_block = RunnableLambda(
-    lambda x: {
+@traced("search")
+def search_all(x):
+    # Retrieved chunks are kept per candidate as explainer / judge evidence
+    evidence = EvidenceStore()
+    return {
         **x,
-        "candidates": search_pipeline_to_candidates(x["description"])
+        "candidates": search_pipeline_to_candidates(x["description"], evidence),
+        "evidence": evidence
     }
-)
+
+search_block = RunnableLambda(search_all)
 
 # =====================================================
 # BLOCK 1 — RERANK
 # =====================================================
 
-rerank_block = RunnableLambda(
+rerank_block = RunnableLambda(traced("rerank")(
     lambda x: {
         **x,
         "candidates": rerank_candidates(
@@ -47,59 +56,217 @@ rerank_block = RunnableLambda(
             x["candidates"]
         )
     }
-)
+))
 
 # =====================================================
 # BLOCK 2 — SCORE
 # =====================================================
 
-score_block = RunnableLambda(
+score_block = RunnableLambda(traced("score")(
     lambda x: {
         **x,
-        "candidates": calculate_match_scores(x["candidates"])
+        "candidates": calculate_match_scores(
+            x["candidates"],
+            x.get("job_requirements", [])
+        )
     }
-)
+))
 
 # =====================================================
-# BLOCK 3 — EXPLAIN
+# BLOCK 3+4 — PER-CANDIDATE EXPLAIN → EVALUATE (FAN-OUT)
 # =====================================================
+# Each candidate (or pack, in batched explainer mode) runs its own
+# explain → evaluate chain, so evaluating candidate 1 does not wait for
+# the slowest explanation. Results are gathered back in ranking order.
 
-explain_block = RunnableLambda(
-    lambda x: {
-        **x,
-        "deep_dives": generate_explanations(
-            x["description"].description if hasattr(x["description"], 'description') else x["description"],
-            x.get("job_requirements", []),
-            x["candidates"]
+def _evidence_packs(x, description_text):
+    evidence = x.get("evidence") or EvidenceStore()
+    return evidence.packs([c.candidate_id for c in x["candidates"]], query=description_text)
+
+
+def submit_offline_evaluations(x, packs):
+    """
+    Queues a sample of the deep dives for background judging; returns immediately.
+    packs are the evidence packs the explainer already used (no lookups here).
+    """
+    request_id = x.get("request_id") or new_request_id()
+    description_text = _description_text(x)
+
+    # Candidates that ran out of time have nothing to judge
+    explained = [d for d in x["deep_dives"] if "explanation" not in d.missing]
+
+    for deep_dive in offline_evaluator.sample(explained):
+        offline_evaluator.submit(
+            request_id,
+            deep_dive,
+            description_text,
+            packs.get(deep_dive.candidate_id, "")
         )
-    }
-)
 
-# =====================================================
-# BLOCK 4 — EVALUATE
-# =====================================================
+    return x
 
-def evaluate_all(x):
-    evaluated = []
-    
-    for deep_dive in x["deep_dives"]:
-        description_text = (
-            x["description"].description 
-            if hasattr(x["description"], 'description') 
-            else str(x["description"])
+
+def _description_text(x):
+    return (
+        x["description"].description
+        if hasattr(x["description"], 'description')
+        else str(x["description"])
+    )
+
+
+def _fan_out_units(candidates):
+    if EXPLAINER_MODE == "batched":
+        return pack_candidates(candidates, PACK_SIZE)
+    return [[c] for c in candidates]
+
+
+def _evaluate_unit(deep_dives, description_text, packs):
+    if EVAL_MODE == "offline":
+        # Sampled and queued once for the whole request after the gather
+        return deep_dives
+    return [
+        evaluate_candidate(
+            deep_dive=deep_dive,
+            description=description_text,
+            cv_evidence=packs.get(deep_dive.candidate_id, "")
         )
-        
-        evaluated.append(
-            evaluate_candidate(
-                deep_dive=deep_dive,
-                description=description_text,
-                cv_evidence=str(x["candidates"])
+        for deep_dive in deep_dives
+    ]
+
+
+def _missing_parts(explained: bool):
+    """Parts of a deep dive that were skipped because the latency budget ran out."""
+    missing = [] if explained else ["explanation"]
+    if EVAL_MODE != "offline":
+        missing.append("evaluation")
+    return missing
+
+
+def _collect(units, explained, judged):
+    """Gathers whatever finished in time, in ranking order, flagging the rest."""
+    deep_dives = []
+    for idx, unit in enumerate(units):
+        if idx in judged:
+            deep_dives.extend(judged[idx])
+        elif idx in explained:
+            deep_dives.extend(
+                d.model_copy(update={"missing": _missing_parts(explained=True)})
+                for d in explained[idx]
             )
-        )
-    
-    return {**x, "deep_dives": evaluated}
+        else:
+            deep_dives.extend(
+                CandidateDeepDive(
+                    candidate_id=c.candidate_id,
+                    explainability=ExplainabilityAnalysis(why_match_summary=""),
+                    is_trustworthy=False,
+                    missing=_missing_parts(explained=False)
+                )
+                for c in unit
+            )
+    return deep_dives
+
+
+def _finish(x, units, explained, judged, packs=None):
+    x = {**x, "deep_dives": _collect(units, explained, judged)}
+    # Without packs nothing was explained, so there is nothing to judge
+    return submit_offline_evaluations(x, packs or {}) if EVAL_MODE == "offline" else x
+
+
+@traced("explain_evaluate")
+def explain_and_evaluate_all(x):
+    description_text = _description_text(x)
+    requirements = x.get("job_requirements", [])
+    deadline = x.get("deadline")
+    explain_deadline = deadline.at_share(EXPLAIN_BUDGET_SHARE) if deadline else None
+    units = _fan_out_units(x["candidates"])
+
+    explained = {}
+    judged = {}
+
+    if not units or is_expired(explain_deadline):
+        # Search / rerank used up the budget: ranked cards without explanations
+        return _finish(x, units, explained, judged)
+
+    packs = _evidence_packs(x, description_text)
+
+    def run(idx, unit):
+        # Units still queued behind the concurrency cap at the deadline never start
+        if is_expired(explain_deadline):
+            return
+        with span("explain"):
+            explained[idx] = generate_explanations(description_text, requirements, unit, evidence=packs)
+        if is_expired(deadline):
+            return
+        # Judge copies so a late judge never mutates what was already returned
+        with span("evaluate"):
+            judged[idx] = _evaluate_unit(
+                [d.model_copy(deep=True) for d in explained[idx]], description_text, packs
+            )
+
+    # No `with`: stragglers are left running (their results still fill the cache)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(units))))
+    # Each task gets its own copy of the request context (trace spans)
+    futures = [
+        executor.submit(contextvars.copy_context().run, run, idx, unit)
+        for idx, unit in enumerate(units)
+    ]
+    done, _ = wait(futures, timeout=timeout_for(deadline))
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for future in done:
+        future.result()  # re-raise real failures; only lateness degrades
+
+    return _finish(x, units, dict(explained), dict(judged), packs)
+
+
+@traced("explain_evaluate")
+async def aexplain_and_evaluate_all(x):
+    description_text = _description_text(x)
+    requirements = x.get("job_requirements", [])
+    deadline = x.get("deadline")
+    explain_deadline = deadline.at_share(EXPLAIN_BUDGET_SHARE) if deadline else None
+    units = _fan_out_units(x["candidates"])
+    semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENCY))
+
+    explained = {}
+    judged = {}
+
+    if not units or is_expired(explain_deadline):
+        return _finish(x, units, explained, judged)
+
+    packs = _evidence_packs(x, description_text)
+
+    async def run(idx, unit):
+        try:
+            async with semaphore:
+                if is_expired(explain_deadline):
+                    return
+                with span("explain"):
+                    explained[idx] = await asyncio.wait_for(
+                        agenerate_explanations(description_text, requirements, unit, evidence=packs),
+                        timeout=timeout_for(explain_deadline)
+                    )
+            if is_expired(deadline):
+                return
+            # Judging is sync (local NLI or Gemini); keep it off the event loop
+            with span("evaluate"):
+                judged[idx] = await asyncio.wait_for(
+                    asyncio.to_thread(
+                        _evaluate_unit,
+                        [d.model_copy(deep=True) for d in explained[idx]],
+                        description_text,
+                        packs
+                    ),
+                    timeout=timeout_for(deadline)
+                )
+        except asyncio.TimeoutError:
+            print(f"Deadline reached for candidates {[c.candidate_id for c in unit]}")
+
+    await asyncio.gather(*(run(idx, unit) for idx, unit in enumerate(units)))
+
+    return _finish(x, units, explained, judged, packs)
 
-evaluate_block = RunnableLambda(evaluate_all)  # ✅ أضف هذا السطر!
+candidate_block = RunnableLambda(explain_and_evaluate_all, afunc=aexplain_and_evaluate_all)
 
 # =====================================================
 # FULL PIPELINE
@@ -110,8 +277,7 @@ hiring_pipeline = (
     | search_block
     | rerank_block
     | score_block
-    | explain_block
-    | evaluate_block
+    | candidate_block
 )
 
 # =====================================================
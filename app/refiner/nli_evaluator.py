@@ -0,0 +1,100 @@
+"""
+Local NLI-based faithfulness scoring.
+Splits an explanation into claims and checks each claim for entailment
+against the candidate's evidence chunks with a small CPU cross-encoder,
+in a single batched predict call.
+"""
+import os
+import re
+import threading
+from typing import List, Optional
+
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+from app.performance_monitor import span
+
+NLI_MODEL_NAME = os.getenv("NLI_MODEL", "cross-encoder/nli-deberta-v3-xsmall")
+EVIDENCE_CHUNK_CHARS = int(os.getenv("NLI_EVIDENCE_CHUNK_CHARS", "600"))
+
+_nli_model = None
+_entailment_idx = None
+_model_lock = threading.Lock()
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def get_nli_model() -> CrossEncoder:
+    global _nli_model, _entailment_idx
+
+    if _nli_model is None:
+        with _model_lock:
+            if _nli_model is None:
+                print(f"Loading NLI model {NLI_MODEL_NAME}...")
+                model = CrossEncoder(NLI_MODEL_NAME, device="cpu")
+                id2label = getattr(model.model.config, "id2label", {}) or {}
+                _entailment_idx = next(
+                    (int(i) for i, label in id2label.items() if str(label).lower() == "entailment"),
+                    1
+                )
+                _nli_model = model
+    return _nli_model
+
+
+def split_claims(explanation: str, min_chars: int = 15) -> List[str]:
+    """One claim per sentence / bullet; drops headings and fragments."""
+    claims = []
+    for part in _SENTENCE_END.split(explanation or ""):
+        claim = _BULLET.sub("", part).strip(" *#")
+        if len(claim) >= min_chars:
+            claims.append(claim)
+    return claims
+
+
+def split_evidence(cv_evidence: str, max_chars: int = EVIDENCE_CHUNK_CHARS) -> List[str]:
+    """Packs evidence lines into premise chunks the NLI model can read in one pass."""
+    chunks = []
+    current = ""
+    for raw_line in (cv_evidence or "").splitlines():
+        raw_line = raw_line.strip()
+        # Overlong lines are windowed so the model never silently truncates them
+        for start in range(0, len(raw_line), max_chars):
+            line = raw_line[start:start + max_chars]
+            if current and len(current) + len(line) + 1 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def nli_faithfulness(explanation: str, cv_evidence: str) -> Optional[float]:
+    """
+    Mean over claims of the best entailment probability across evidence chunks.
+    A claim counts as supported if any chunk entails it. None when the
+    explanation has no checkable claims (empty or garbage output).
+    """
+    claims = split_claims(explanation)
+    chunks = split_evidence(cv_evidence)
+
+    if not claims:
+        return None
+    if not chunks:
+        return 0.0
+
+    model = get_nli_model()
+
+    pairs = [(chunk, claim) for claim in claims for chunk in chunks]
+    with span("model.nli", pairs=len(pairs)):
+        logits = np.asarray(model.predict(pairs, batch_size=32, convert_to_numpy=True))
+    entailment = _softmax(logits)[:, _entailment_idx].reshape(len(claims), len(chunks))
+
+    return float(entailment.max(axis=1).mean())
@@ -0,0 +1,147 @@
+"""
+Sampled, asynchronous offline evaluation.
+A configurable fraction of requests (or candidates) is judged on a background
+worker and the scores are persisted for quality dashboards; the response
+never waits for them.
+"""
+import atexit
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from app.models import CandidateDeepDive
+from app.refiner.cache import content_hash
+from app.refiner.evaluator import evaluate_candidate
+
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# "inline": judge every candidate before responding (previous behaviour)
+# "offline": judge a sample in the background
+EVAL_MODE = os.getenv("EVAL_MODE", "inline")
+# e.g. 1.0 in staging, 0.02 in production
+EVAL_SAMPLE_RATE = float(os.getenv("EVAL_SAMPLE_RATE", "1.0"))
+# "request": all-or-nothing per request, "candidate": each candidate independently
+EVAL_SAMPLE_UNIT = os.getenv("EVAL_SAMPLE_UNIT", "request")
+EVAL_OFFLINE_BACKEND = os.getenv("EVAL_OFFLINE_BACKEND", "llm")
+EVAL_QUEUE_SIZE = int(os.getenv("EVAL_QUEUE_SIZE", "1000"))
+EVAL_SCORES_PATH = os.getenv("EVAL_SCORES_PATH", os.path.join(base_dir, "eval_scores.sqlite"))
+
+
+class OfflineEvaluator:
+
+    def __init__(
+        self,
+        path: str = EVAL_SCORES_PATH,
+        backend: str = EVAL_OFFLINE_BACKEND,
+        max_queue: int = EVAL_QUEUE_SIZE
+    ):
+        self.path = path
+        self.backend = backend
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    # ---------- Producer side ----------
+
+    def sample(self, deep_dives: List[CandidateDeepDive], rate: float = None, unit: str = None) -> List[CandidateDeepDive]:
+        rate = EVAL_SAMPLE_RATE if rate is None else rate
+        unit = unit or EVAL_SAMPLE_UNIT
+
+        if unit == "request":
+            return list(deep_dives) if random.random() < rate else []
+        return [d for d in deep_dives if random.random() < rate]
+
+    def submit(self, request_id: str, deep_dive: CandidateDeepDive, description: str, cv_evidence: str) -> bool:
+        self._ensure_worker()
+        job = (request_id, deep_dive.model_copy(deep=True), description, cv_evidence, time.time())
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            # Never block the request path on the judge
+            self.dropped += 1
+            print(f"Offline eval queue full, dropped {deep_dive.candidate_id} ({self.dropped} total)")
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ---------- Worker side ----------
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="offline-eval", daemon=True)
+                self._worker.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS eval_scores (
+                request_id TEXT NOT NULL,
+                candidate_id TEXT NOT NULL,
+                jd_hash TEXT NOT NULL,
+                backend TEXT NOT NULL,
+                faithfulness_score REAL,
+                relevancy_score REAL,
+                is_trustworthy INTEGER,
+                queued_at REAL NOT NULL,
+                evaluated_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_eval_scores_time ON eval_scores(evaluated_at)")
+        conn.commit()
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            request_id, deep_dive, description, cv_evidence, queued_at = self._queue.get()
+            try:
+                judged = evaluate_candidate(
+                    deep_dive=deep_dive,
+                    description=description,
+                    cv_evidence=cv_evidence,
+                    backend=self.backend
+                )
+                conn.execute(
+                    "INSERT INTO eval_scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        request_id,
+                        judged.candidate_id,
+                        content_hash(description),
+                        self.backend,
+                        judged.faithfulness_score,
+                        judged.relevancy_score,
+                        int(judged.is_trustworthy),
+                        queued_at,
+                        time.time()
+                    )
+                )
+                conn.commit()
+            except Exception as e:
+                print(f"Offline evaluation failed for {deep_dive.candidate_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def drain(self, timeout: float = 10.0):
+        """Best-effort wait for queued evaluations (used at shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+offline_evaluator = OfflineEvaluator()
+atexit.register(offline_evaluator.drain)
@@ -1,13 +1,28 @@
+import threading
 from typing import List
 from sentence_transformers import CrossEncoder
 import numpy as np
 from app.models import CandidateCard
+from app.performance_monitor import span
 
 
 # ------------------ Core Function ------------------
 
 model_name = "cross-encoder/ms-marco-MiniLM-L-6-v2"
-cross_encoder = CrossEncoder(model_name)
+
+_cross_encoder = None
+_model_lock = threading.Lock()
+
+
+def get_cross_encoder() -> CrossEncoder:
+    global _cross_encoder
+
+    if _cross_encoder is None:
+        with _model_lock:
+            if _cross_encoder is None:
+                print(f"Loading cross-encoder {model_name}...")
+                _cross_encoder = CrossEncoder(model_name)
+    return _cross_encoder
 
 
 def rerank_candidates(description: str, candidates: List[CandidateCard]) -> List[CandidateCard]:
@@ -23,7 +38,8 @@ def rerank_candidates(description: str, candidates: List[CandidateCard]) -> List
         for c in candidates
     ]
 
-    scores = cross_encoder.predict(candidate_texts)
+    with span("model.rerank", pairs=len(candidate_texts)):
+        scores = get_cross_encoder().predict(candidate_texts)
 
     for candidate, score in zip(candidates, scores):
         score_norm = 1 / (1 + np.exp(-score))
@@ -1,16 +1,29 @@
-from typing import List
+from typing import List, Optional
 from app.models import CandidateCard
+from app.skill_taxonomy import taxonomy, coverage
 
 
-def calculate_match_scores(candidates: List[CandidateCard]) -> List[CandidateCard]:
+def calculate_match_scores(
+    candidates: List[CandidateCard],
+    job_requirements: Optional[List[str]] = None
+) -> List[CandidateCard]:
 
     if not candidates:
         return []
 
+    # JD skills are encoded once; each candidate is then a single AND + popcount.
+    # Skills the taxonomy has never seen get no bit but still count as required
+    required_bits = taxonomy.encode(job_requirements or [])
+    required_count = len(taxonomy.distinct(job_requirements or []))
+
     for c in candidates:
 
         base = c.score
-        skills = min(len(c.skills_match) / 5, 1)
+        if required_count:
+            skills = coverage(required_bits, c.skill_bitset, required_count)
+        else:
+            # No usable JD skills -- fall back to profile breadth
+            skills = min(len(c.skills_match) / 5, 1)
         experience = min(c.years_experience / 10, 1)
 
         # -------- Final weighted score --------
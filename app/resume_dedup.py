@@ -0,0 +1,290 @@
+"""
+Near-duplicate resume detection.
+Each resume gets a MinHash signature over word shingles at ingest. Banded
+LSH buckets are kept in SQLite next to the signatures, so finding the
+likely duplicates of a new resume is a handful of indexed lookups rather
+than a comparison against every stored resume. Resumes whose estimated
+Jaccard similarity clears DEDUP_THRESHOLD are linked to one canonical
+candidate, and search collapses them to a single result.
+
+    python -m app.resume_dedup [directory]   # indexes files ingested before dedup existed
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", os.path.join(base_dir, "resume_dedup.sqlite"))
+# Estimated Jaccard similarity of shingle sets above which two resumes are one person
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_SHINGLE_WORDS = int(os.getenv("DEDUP_SHINGLE_WORDS", "5"))
+# bands * rows = permutations. 16 x 8 makes pairs above ~0.7 similarity
+# share a bucket with high probability; the threshold is then checked exactly
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_ROWS = int(os.getenv("DEDUP_ROWS", "8"))
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"[a-z0-9+#]+")
+# Fixed seed: signatures must be comparable across processes and runs
+_SEED = 1
+
+_permutations = None
+
+
+def _hash_permutations(num_perm: int):
+    global _permutations
+
+    if _permutations is None or _permutations[0].shape[0] != num_perm:
+        rng = np.random.RandomState(_SEED)
+        a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        _permutations = (a, b)
+    return _permutations
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_WORDS) -> set:
+    """Word n-grams of the normalized text; formatting and punctuation changes do not matter."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str, num_perm: int = DEDUP_BANDS * DEDUP_ROWS) -> Optional[np.ndarray]:
+    """MinHash signature (uint32 per permutation), or None for empty text."""
+    values = shingles(text)
+    if not values:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(value.encode("utf-8")) for value in values), dtype=np.uint64, count=len(values)
+    )
+    a, b = _hash_permutations(num_perm)
+    # Universal hashing (a*x + b) mod p per permutation; uint64 wraparound is intended
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(hashes, a) + b) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the underlying shingle sets."""
+    return float(np.mean(signature_a == signature_b))
+
+
+def band_keys(signature: np.ndarray, bands: int = DEDUP_BANDS, rows: int = DEDUP_ROWS) -> List[str]:
+    return [
+        hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()
+        for band in range(bands)
+    ]
+
+
+class DedupIndex:
+    """
+    Signatures and LSH buckets per candidate, and the canonical candidate each
+    one is linked to. The first version of a resume seen stays canonical.
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, threshold: float = DEDUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS signatures (
+                candidate_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                canonical_id TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                candidate_id TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON lsh_buckets(band, bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_candidate ON lsh_buckets(candidate_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sig_canonical ON signatures(canonical_id)")
+        self._conn.commit()
+
+    def _signature(self, candidate_id: str) -> Optional[np.ndarray]:
+        row = self._conn.execute(
+            "SELECT signature FROM signatures WHERE candidate_id = ?", (candidate_id,)
+        ).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint32) if row else None
+
+    def _best_match(self, candidate_id: str, signature: np.ndarray, keys: List[str]) -> Optional[str]:
+        neighbours = set()
+        for band, key in enumerate(keys):
+            rows = self._conn.execute(
+                "SELECT candidate_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, key)
+            ).fetchall()
+            neighbours.update(row[0] for row in rows)
+        neighbours.discard(candidate_id)
+
+        best, best_score = None, self.threshold
+        for neighbour in sorted(neighbours):
+            other = self._signature(neighbour)
+            if other is None or other.shape != signature.shape:
+                continue
+            score = similarity(signature, other)
+            if score >= best_score:
+                best, best_score = neighbour, score
+        return best
+
+    def add(self, candidate_id: str, signature: np.ndarray) -> str:
+        """Indexes (or re-indexes) a resume and returns the canonical candidate it belongs to."""
+        candidate_id = str(candidate_id)
+        keys = band_keys(signature)
+        with self._lock:
+            self._remove_locked(candidate_id)
+            match = self._best_match(candidate_id, signature, keys)
+            canonical_id = candidate_id
+            if match is not None:
+                canonical_id = self._conn.execute(
+                    "SELECT canonical_id FROM signatures WHERE candidate_id = ?", (match,)
+                ).fetchone()[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signatures (candidate_id, signature, canonical_id) VALUES (?, ?, ?)",
+                (candidate_id, signature.astype(np.uint32).tobytes(), canonical_id)
+            )
+            self._conn.executemany(
+                "INSERT INTO lsh_buckets (band, bucket, candidate_id) VALUES (?, ?, ?)",
+                [(band, key, candidate_id) for band, key in enumerate(keys)]
+            )
+            self._conn.commit()
+        return canonical_id
+
+    def remove(self, candidate_id: str):
+        with self._lock:
+            self._remove_locked(str(candidate_id))
+            self._conn.commit()
+
+    def _remove_locked(self, candidate_id: str):
+        self._conn.execute("DELETE FROM lsh_buckets WHERE candidate_id = ?", (candidate_id,))
+        self._conn.execute("DELETE FROM signatures WHERE candidate_id = ?", (candidate_id,))
+        # The remaining versions elect a new canonical (lowest candidate_id, for stability)
+        linked = [
+            row[0] for row in self._conn.execute(
+                "SELECT candidate_id FROM signatures WHERE canonical_id = ? ORDER BY candidate_id", (candidate_id,)
+            ).fetchall()
+        ]
+        if linked:
+            self._conn.execute(
+                "UPDATE signatures SET canonical_id = ? WHERE canonical_id = ?", (linked[0], candidate_id)
+            )
+
+    def contains(self, candidate_id: str) -> bool:
+        with self._lock:
+            return self._signature(str(candidate_id)) is not None
+
+    def canonical_many(self, candidate_ids: Iterable[str]) -> Dict[str, str]:
+        """candidate_id -> canonical candidate_id; unknown IDs map to themselves."""
+        ids = list(dict.fromkeys(str(cid) for cid in candidate_ids))
+        canonical = {cid: cid for cid in ids}
+        with self._lock:
+            # SQLite's default limit on bound parameters per statement
+            for start in range(0, len(ids), 900):
+                batch = ids[start:start + 900]
+                rows = self._conn.execute(
+                    f"SELECT candidate_id, canonical_id FROM signatures "
+                    f"WHERE candidate_id IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                canonical.update(rows)
+        return canonical
+
+    def duplicates_of(self, canonical_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT candidate_id FROM signatures WHERE canonical_id = ? AND candidate_id != ? ORDER BY candidate_id",
+                (str(canonical_id), str(canonical_id))
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> Optional[DedupIndex]:
+    global _index
+
+    if not DEDUP_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DedupIndex()
+    return _index
+
+
+def link_duplicates(candidate_id: str, text: str) -> str:
+    """Indexes one resume's text; returns its canonical candidate_id (itself if it is not a duplicate)."""
+    index = get_dedup_index()
+    signature = minhash_signature(text) if index is not None else None
+    if signature is None:
+        return str(candidate_id)
+    return index.add(candidate_id, signature)
+
+
+def collapse_duplicates(candidate_ids: List[str]) -> Dict[str, List[str]]:
+    """
+    Groups result candidate_ids (in rank order) by person: the first-ranked
+    version of each person -> the other versions that were also retrieved.
+    """
+    index = get_dedup_index()
+    canonical = index.canonical_many(candidate_ids) if index is not None else {}
+    kept: Dict[str, str] = {}
+    groups: Dict[str, List[str]] = {}
+    for cid in candidate_ids:
+        cid = str(cid)
+        person = canonical.get(cid, cid)
+        if person not in kept:
+            kept[person] = cid
+            groups[cid] = []
+        elif cid != kept[person] and cid not in groups[kept[person]]:
+            groups[kept[person]].append(cid)
+    return groups
+
+
+def rebuild(directory_path: str = os.path.join(base_dir, "data")):
+    """Indexes the ingested files under directory_path that the dedup index does not have yet."""
+    from app.ingest import load_file
+    from app.ingest_manifest import IngestManifest
+
+    index = get_dedup_index()
+    if index is None:
+        print("Deduplication disabled (DEDUP_ENABLED=false)")
+        return
+
+    manifest = IngestManifest()
+    indexed, linked = 0, 0
+    for path in manifest.paths_under(directory_path):
+        entry = manifest.get(path)
+        if entry is None or index.contains(entry["candidate_id"]) or not os.path.exists(path):
+            continue
+        try:
+            text = "\n".join(doc.page_content for doc in load_file(path))
+        except Exception as e:
+            print(f"Skipping {os.path.basename(path)}: {e}")
+            continue
+        indexed += 1
+        if link_duplicates(entry["candidate_id"], text) != entry["candidate_id"]:
+            linked += 1
+    print(f"Indexed {indexed} resumes; {linked} linked to an existing candidate")
+
+
+if __name__ == "__main__":
+    import sys
+
+    rebuild(*sys.argv[1:2])
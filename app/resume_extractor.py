@@ -0,0 +1,337 @@
+"""
+Local resume metadata extractor.
+Rule-based fast path that runs before the LLM at ingest: skills from the
+skill taxonomy, years of experience from date ranges in the work
+history (or an explicit "N years of experience"), and name / title from the
+resume header. Each result carries a confidence score; only resumes below
+LOCAL_EXTRACT_MIN_CONFIDENCE are sent to the LLM.
+"""
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.models import CandidateMetadata
+from app.skill_taxonomy import normalize_skill, taxonomy
+
+# 0 never calls the LLM for extraction; anything above 1 disables the fast path
+LOCAL_EXTRACT_MIN_CONFIDENCE = float(os.getenv("LOCAL_EXTRACT_MIN_CONFIDENCE", "0.75"))
+# Skills kept per candidate (the LLM prompt asks for the top 5-10)
+LOCAL_EXTRACT_MAX_SKILLS = int(os.getenv("LOCAL_EXTRACT_MAX_SKILLS", "10"))
+
+# Weights of each field in the confidence score (sum to 1)
+_WEIGHTS = {"name": 0.3, "job_title": 0.2, "years_of_experience": 0.2, "top_skills": 0.3}
+# Skills needed for full credit on the skills field. Credit grows with the
+# square of the share found, so the other fields alone (0.7) plus one or two
+# skills stay below LOCAL_EXTRACT_MIN_CONFIDENCE and the LLM is asked
+_CONFIDENT_SKILL_COUNT = 5
+
+# Aliases that are also ordinary words or initials; only counted when they are
+# a whole item of a list-like line ("Python, Go, Docker"), never a word inside
+# a longer item ("Go to market, SEO, Content")
+_AMBIGUOUS_TERMS = {"go", "js", "ts", "py", "ml", "dl", "wp", "rest", "node", "java script"}
+
+_SECTION_HEADINGS = {
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "career history"],
+    "education": ["education", "academic background", "qualifications", "certifications", "courses", "training"],
+    "skills": ["skills", "technical skills", "core skills", "technologies", "tech stack", "competencies"],
+    "summary": ["summary", "professional summary", "profile", "about me", "objective", "career objective"],
+    "other": ["projects", "languages", "interests", "hobbies", "references", "awards", "publications", "contact"],
+}
+_HEADING_TO_SECTION = {heading: section for section, headings in _SECTION_HEADINGS.items() for heading in headings}
+
+_TITLE_KEYWORDS = (
+    "engineer", "developer", "programmer", "architect", "manager", "analyst", "scientist",
+    "designer", "consultant", "administrator", "specialist", "lead", "director", "intern",
+    "devops", "sre", "cto", "head of", "officer", "coordinator", "researcher", "technician",
+)
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+
+
+def _date_pattern(prefix: str) -> str:
+    # "Mar 2019", "March 2019", "03/2019", "2019"
+    return rf"(?:(?P<{prefix}m>{_MONTH})\s*|(?P<{prefix}n>\d{{1,2}})\s*[/.-]\s*)?(?P<{prefix}y>(?:19|20)\d{{2}})"
+
+
+_DATE_RANGE = re.compile(
+    _date_pattern("s")
+    + r"\s*(?:-|–|—|to|until)\s*"
+    + r"(?:(?P<present>present|current|now|today|date)|" + _date_pattern("e") + r")",
+    re.IGNORECASE
+)
+_EXPLICIT_YEARS = re.compile(
+    r"(\d{1,2})\s*\+?\s*(?:years?|yrs?)\s+(?:of\s+)?(?:professional\s+|industry\s+|work\s+|hands-on\s+)?experience",
+    re.IGNORECASE
+)
+_NAME_LABEL = re.compile(r"^\s*(?:full\s+)?name\s*[:\-]\s*(.+)$", re.IGNORECASE)
+_TITLE_LABEL = re.compile(r"^\s*(?:job\s+title|title|position|role|current\s+role)\s*[:\-]\s*(.+)$", re.IGNORECASE)
+_NAME_TOKEN = re.compile(r"^[A-Z][A-Za-z'\-]*\.?$|^[A-Z][A-Z'\-]+$")
+_LIST_SEPARATORS = re.compile(r"[,|•;/·]")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+# Words as skills spell them: c++, c#, node.js, scikit-learn
+_TOKEN = re.compile(r"\w[\w+#.\-]*")
+# Longest skill phrase looked up, in words ("google cloud platform")
+_MAX_TERM_WORDS = 4
+# "Senior Engineer 2019 – Present", "Backend Developer (since Mar 2020)"
+_TRAILING_DATE = re.compile(
+    rf"[\s,(\[]*(?:since\s+|from\s+)?(?:{_MONTH}\s*)?(?:\d{{1,2}}\s*[/.-]\s*)?(?:19|20)\d{{2}}\s*[)\]]?\s*$",
+    re.IGNORECASE
+)
+
+
+class LocalExtraction:
+    """Result of the local extractor: the metadata plus how far to trust it."""
+
+    def __init__(self, metadata: CandidateMetadata, confidence: float, missing: List[str]):
+        self.metadata = metadata
+        self.confidence = confidence
+        # Fields the extractor could not find (the LLM is asked for these)
+        self.missing = missing
+
+    @property
+    def is_confident(self) -> bool:
+        return self.confidence >= LOCAL_EXTRACT_MIN_CONFIDENCE
+
+
+# ---------- Sections ----------
+
+def _heading(line: str) -> Optional[str]:
+    text = line.strip().strip(":").strip().lower()
+    if not text or len(text) > 40:
+        return None
+    return _HEADING_TO_SECTION.get(text)
+
+
+def _split_sections(lines: List[str]) -> Dict[str, List[str]]:
+    """Lines grouped by the resume section they fall under; 'header' is everything before the first heading."""
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for line in lines:
+        section = _heading(line)
+        if section is not None:
+            current = section
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(line)
+    return sections
+
+
+# ---------- Skills ----------
+
+def _skill_mentions(line: str):
+    """(term, canonical skill) for each skill in the line, longest phrase first at each word."""
+    # Set lookups per word n-gram: nothing to rebuild when ingest learns new skills
+    words = [token.rstrip(".").lower() for token in _TOKEN.findall(line)]
+    i = 0
+    while i < len(words):
+        for size in range(min(_MAX_TERM_WORDS, len(words) - i), 0, -1):
+            term = " ".join(words[i:i + size])
+            canonical = taxonomy.lookup(term) if len(term) >= 2 else None
+            if canonical is not None:
+                yield term, canonical
+                i += size
+                break
+        else:
+            i += 1
+
+
+def _list_items(line: str) -> set:
+    """Normalized items of a list-like line ("Languages: Go, Python" -> {"go", "python"}); empty otherwise."""
+    if len(_LIST_SEPARATORS.findall(line)) < 2:
+        return set()
+    # A leading label belongs to the heading, not the first item
+    return {normalize_skill(item.rsplit(":", 1)[-1]) for item in _LIST_SEPARATORS.split(line)}
+
+
+def extract_skills(lines: List[str], max_skills: int = LOCAL_EXTRACT_MAX_SKILLS) -> List[str]:
+    """Skill display names (as the LLM path returns them), most frequently mentioned first."""
+    counts: Dict[str, int] = {}
+    first_seen: Dict[str, int] = {}
+    for line in lines:
+        list_items = _list_items(line)
+        for term, canonical in _skill_mentions(line):
+            if term in _AMBIGUOUS_TERMS and term not in list_items:
+                continue
+            counts[canonical] = counts.get(canonical, 0) + 1
+            first_seen.setdefault(canonical, len(first_seen))
+    ranked = sorted(counts, key=lambda skill: (-counts[skill], first_seen[skill]))
+    return [taxonomy.display_name(skill) for skill in ranked[:max_skills]]
+
+
+# ---------- Years of experience ----------
+
+def _month_index(month: Optional[str], number: Optional[str], year: str, default_month: int) -> int:
+    if month:
+        value = _MONTHS.get(month[:3].lower(), default_month)
+    elif number and 1 <= int(number) <= 12:
+        value = int(number)
+    else:
+        value = default_month
+    return int(year) * 12 + value - 1
+
+
+def _date_ranges(lines: List[str], today: date) -> List[Tuple[int, int]]:
+    """(start, end) month indexes of every date range, end exclusive."""
+    now = today.year * 12 + today.month - 1
+    ranges = []
+    for line in lines:
+        for match in _DATE_RANGE.finditer(line):
+            start = _month_index(match.group("sm"), match.group("sn"), match.group("sy"), default_month=1)
+            if match.group("present"):
+                end = now
+            else:
+                end = _month_index(match.group("em"), match.group("en"), match.group("ey"), default_month=12)
+            end = min(end, now) + 1
+            if start < end:
+                ranges.append((start, end))
+    return ranges
+
+
+def _merged_months(ranges: List[Tuple[int, int]]) -> int:
+    """Months covered by the ranges, counting overlapping jobs once."""
+    total = 0
+    current_start, current_end = None, None
+    for start, end in sorted(ranges):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def extract_years(sections: Dict[str, List[str]], today: Optional[date] = None) -> Optional[int]:
+    """Explicit "N years of experience" wins; otherwise the union of work-history date ranges."""
+    for lines in (sections.get("summary", []), sections.get("header", [])):
+        for line in lines:
+            match = _EXPLICIT_YEARS.search(line)
+            if match:
+                return int(match.group(1))
+
+    # Degrees and courses also carry date ranges; they are not work experience
+    work_lines = sections.get("experience") or [
+        line for section, lines in sections.items() if section not in ("education", "other") for line in lines
+    ]
+    ranges = _date_ranges(work_lines, today or date.today())
+    if not ranges:
+        return None
+    return _merged_months(ranges) // 12
+
+
+# ---------- Name and title ----------
+
+def _looks_like_name(line: str) -> bool:
+    tokens = line.split()
+    if not 2 <= len(tokens) <= 4 or any(ch.isdigit() or ch in "@:/|," for ch in line):
+        return False
+    lowered = line.lower()
+    if _heading(line) or any(keyword in lowered for keyword in _TITLE_KEYWORDS):
+        return False
+    return all(_NAME_TOKEN.match(token) for token in tokens)
+
+
+def _looks_like_title(line: str) -> bool:
+    lowered = line.lower()
+    return (
+        len(line) <= 80
+        and "@" not in line
+        and any(re.search(rf"\b{re.escape(keyword)}\b", lowered) for keyword in _TITLE_KEYWORDS)
+    )
+
+
+def _clean_title(line: str) -> str:
+    # "Senior Python Developer | Acme Corp | 2019 - Present" -> "Senior Python Developer"
+    line = line.strip()
+    dates = _DATE_RANGE.search(line)
+    if dates:
+        # "2019 - Present: Senior Engineer" keeps what follows the dates
+        line = line[:dates.start()] if line[:dates.start()].strip(" -–—|•*(") else line[dates.end():].lstrip(" :-–—|)")
+    title = re.split(r"\s+(?:[|@–—]|-|at)\s+|,\s+", line.strip(), maxsplit=1)[0]
+    title = _TRAILING_DATE.sub("", title)
+    return title.strip(" -–—|•*(").strip()
+
+
+def extract_name_and_title(sections: Dict[str, List[str]]) -> Tuple[Optional[str], Optional[str]]:
+    name, title = None, None
+    header = [line.strip() for line in sections.get("header", []) if line.strip()][:8]
+
+    for line in header:
+        label = _NAME_LABEL.match(line)
+        if label and name is None:
+            name = label.group(1).strip()
+            continue
+        label = _TITLE_LABEL.match(line)
+        if label and title is None:
+            title = _clean_title(label.group(1))
+            continue
+        if name is None and _looks_like_name(line):
+            name = line.title() if line.isupper() else line
+        elif title is None and name is not None and _looks_like_title(line):
+            title = _clean_title(line)
+
+    if title is None:
+        # Most recent role: the first title-like line of the work history
+        for line in sections.get("experience", []):
+            if line.strip() and _looks_like_title(line):
+                title = _clean_title(line)
+                break
+    return name, title
+
+
+# ---------- Summary and confidence ----------
+
+def _summary(sections: Dict[str, List[str]], title: Optional[str], years: Optional[int], skills: List[str]) -> str:
+    text = " ".join(line.strip() for line in sections.get("summary", []) if line.strip())
+    if text:
+        return " ".join(_SENTENCE.split(text)[:3])
+
+    parts = [title or "Candidate"]
+    if years is not None:
+        parts.append(f"with {years} years of experience")
+    if skills:
+        parts.append(f"working with {', '.join(skills[:5])}")
+    return " ".join(parts) + "."
+
+
+def _confidence(name: Optional[str], title: Optional[str], years: Optional[int], skills: List[str]) -> float:
+    score = 0.0
+    if name:
+        score += _WEIGHTS["name"]
+    if title:
+        score += _WEIGHTS["job_title"]
+    if years is not None:
+        score += _WEIGHTS["years_of_experience"]
+    score += _WEIGHTS["top_skills"] * min(len(skills) / _CONFIDENT_SKILL_COUNT, 1.0) ** 2
+    return round(score, 3)
+
+
+def extract_local(text: str, today: Optional[date] = None) -> LocalExtraction:
+    """Rule-based extraction of CandidateMetadata from resume text; pure CPU, no network."""
+    lines = text.splitlines()
+    sections = _split_sections(lines)
+
+    name, title = extract_name_and_title(sections)
+    years = extract_years(sections, today)
+    skills = extract_skills(lines)
+
+    missing = [
+        field for field, value in (
+            ("name", name), ("job_title", title), ("years_of_experience", years), ("top_skills", skills)
+        ) if value is None or value == []
+    ]
+    metadata = CandidateMetadata(
+        name=name or "",
+        summary=_summary(sections, title, years, skills),
+        top_skills=skills,
+        years_of_experience=years,
+        job_title=title,
+    )
+    return LocalExtraction(metadata, _confidence(name, title, years, skills), missing)
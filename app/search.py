@@ -4,6 +4,8 @@ Search Implementation for Job Description Processing
 from app.models import JobDescription, JobDescriptionRequest
 from app.vector_store import get_vectorstore
 from app.parser import parse_job_description_request
+from app.performance_monitor import span
+from app import llm_gateway
 import os
 from dotenv import load_dotenv
 from langsmith import traceable
@@ -11,10 +13,9 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.documents import Document
 from typing import List
 from langchain_classic.retrievers import BM25Retriever,EnsembleRetriever
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 load_dotenv()
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+llm = llm_gateway.get_chat_model(temperature=0)
 @traceable(name="get_multi_query_variants", run_type="llm")
 def get_multi_query_variants(job, num_queries: int = 3):
     """Generates multiple query variations from either JobDescription or JobDescriptionRequest."""
@@ -58,7 +59,7 @@ Department: {parsed_job.department or 'Not specified'}
 
     chain = multi_query_prompt | llm 
 
-    response = chain.invoke({"question": jd_text})
+    response = llm_gateway.invoke("multi_query", chain, {"question": jd_text})
     
    
     generated_queries = response.content.split("\n")
@@ -88,15 +89,18 @@ def hybrid_search(parsed_job: JobDescription, queries: List[str], k_fetch: int =
     combined_query = f"{parsed_job.title} " + " ".join(queries)
     
     # Get vector search results first
-    vector_results = vector_retriever.invoke(combined_query)
+    with span("vector.search"):
+        vector_results = vector_retriever.invoke(combined_query)
     
     # Use the same set of documents for both retrievers to avoid reloading
     keyword_retriever = BM25Retriever.from_documents(vector_results)
     keyword_retriever.k = k_fetch
 
     # Use individual retrievers and combine results manually
-    vector_results = vector_retriever.invoke(combined_query)
-    keyword_results = keyword_retriever.invoke(combined_query)
+    with span("vector.search"):
+        vector_results = vector_retriever.invoke(combined_query)
+    with span("bm25.search"):
+        keyword_results = keyword_retriever.invoke(combined_query)
 
     # Deduplicate results while preserving order and scores
     seen_content = set()
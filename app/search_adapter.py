@@ -4,11 +4,16 @@ This module uses combined_search_pipeline to fetch documents from the vector sto
 then converts the results to CandidateCard objects using search_results_to_candidates.
 """
 
-from typing import List, Union, Any
+from typing import List, Optional, Union, Any
 import re
 import os
 from app.models import CandidateCard, JobDescription, JobDescriptionRequest
 from app.search import combined_search_pipeline
+from app.skill_taxonomy import taxonomy, bits_from_hex
+from app.refiner.evidence import EvidenceStore
+from app.profile_store import get_profile_store
+from app.resume_dedup import collapse_duplicates
+from app.performance_monitor import span
 
 
 def _normalize_job_input(job):
@@ -80,23 +85,89 @@ def _parse_skills(skills_input: Any) -> List[str]:
     return [str(skills_input).strip()]
 
 
+def _card_from_profile(profile: dict, score: float) -> CandidateCard:
+    """Profiles are normalized at ingest time, so no parsing is needed here."""
+    name = profile["name"]
+    if not name:
+        name = os.path.splitext(profile["source"])[0].replace("_", " ").replace("-", " ").title()
+
+    return CandidateCard(
+        candidate_id=profile["candidate_id"],
+        name=name or f"Candidate_{profile['candidate_id']}",
+        current_title=profile["title"],
+        company="",
+        years_experience=profile["years_experience"],
+        seniority_level="Unknown",
+        location="",
+        score=score,
+        skills_match=profile["skills"],
+        skill_bitset=bits_from_hex(profile["skill_bitset"]),
+        ai_reasoning_short=""
+    )
+
+
+def _one_card_per_person(
+    candidates: List[CandidateCard],
+    evidence_store: Optional[EvidenceStore] = None
+) -> List[CandidateCard]:
+    """
+    Collapses several chunks of one resume, and near-duplicate versions of a
+    resume (app.resume_dedup), onto the highest-ranked card. The other
+    versions' evidence chunks are pooled under the card that is kept.
+    """
+    with span("dedup.collapse"):
+        groups = collapse_duplicates([card.candidate_id for card in candidates])
+
+    cards = {}
+    for card in candidates:
+        cards.setdefault(card.candidate_id, card)
+
+    collapsed = []
+    for kept_id, duplicate_ids in groups.items():
+        card = cards[kept_id]
+        card.duplicate_ids = duplicate_ids
+        if evidence_store is not None:
+            for duplicate_id in duplicate_ids:
+                for text in evidence_store.chunks(duplicate_id):
+                    evidence_store.add(kept_id, text)
+        collapsed.append(card)
+    return collapsed
+
+
 def search_pipeline_to_candidates(
-    job: Union[str, JobDescription, JobDescriptionRequest]
+    job: Union[str, JobDescription, JobDescriptionRequest],
+    evidence_store: Optional[EvidenceStore] = None
 ) -> List[CandidateCard]:
     """
     1. Normalize job input
     2. Run the combined search pipeline
     3. Convert results to CandidateCard
+    4. Keep the retrieved chunks per candidate in evidence_store (if given)
     """
     
     normalized_job = _normalize_job_input(job)
     
     search_results = combined_search_pipeline(normalized_job, k=15)
+
+    if evidence_store is not None:
+        evidence_store.add_search_results(search_results)
+
+    # One bulk lookup for every hit; chunks ingested before the profile store
+    # existed still carry their metadata and take the parsing path below
+    with span("profiles.hydrate"):
+        profiles = get_profile_store().get_many(
+            (res.get("metadata") or {}).get("candidate_id", idx) for idx, res in enumerate(search_results)
+        )
     
     candidates = []
     
     for idx, res in enumerate(search_results):
         meta = res.get("metadata", {}) or {}
+
+        profile = profiles.get(str(meta.get("candidate_id", idx)))
+        if profile is not None:
+            candidates.append(_card_from_profile(profile, float(res.get("score", 0.0))))
+            continue
         
         print(f"\n{'='*60}")
         print(f" Processing candidate #{idx + 1}")
@@ -104,6 +175,7 @@ def search_pipeline_to_candidates(
         
         raw_skills = None
         skill_field_used = None
+        skill_bitset = bits_from_hex(meta.get("skill_bitset"))
         
         # Check for skills in multiple possible fields
         possible_skill_fields = [
@@ -133,7 +205,12 @@ def search_pipeline_to_candidates(
         else:
             print(f"✅ Using skills from field: {skill_field_used}")
         
-        skills = _parse_skills(raw_skills)
+        if skill_bitset:
+            # Normalized at ingest time -- no string parsing needed
+            skills = taxonomy.decode(skill_bitset)
+        else:
+            skills = _parse_skills(raw_skills)
+            skill_bitset = taxonomy.encode(skills)
         print(f"✅ Parsed skills ({len(skills)} items): {skills}")
         print(f"✅ Type of parsed skills: {type(skills)}")
         
@@ -175,6 +252,7 @@ def search_pipeline_to_candidates(
                 location=str(meta.get("location", "")),
                 score=float(res.get("score", 0.0)),
                 skills_match=skills,
+                skill_bitset=skill_bitset,
                 ai_reasoning_short=""
             )
             
@@ -204,6 +282,8 @@ def search_pipeline_to_candidates(
                 print(f" Created CandidateCard with empty skills list")
             except:
                 print(f" Failed to create CandidateCard even with empty skills")
+
+    candidates = _one_card_per_person(candidates, evidence_store)
     
     print(f"\n{'='*60}")
     print(f" Total candidates created: {len(candidates)}")
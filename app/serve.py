@@ -0,0 +1,148 @@
+"""
+Pre-fork server launcher.
+
+    python -m app.serve [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+`uvicorn --workers N` starts each worker with spawn, so every worker imports
+the app and loads its own copy of MiniLM and the cross-encoders. This
+launcher imports the app once with the models preloaded, binds the listening
+socket, then forks the workers: the model weights stay in pages shared
+copy-on-write with the parent. Each worker warms up on startup, and workers
+that die are restarted. Without os.fork (Windows) it runs one uvicorn server.
+
+Preloading is the point of this launcher, so PRELOAD_MODELS defaults to true
+here even though the app's own default is false; an explicit
+PRELOAD_MODELS=false (environment or .env) is respected, and each worker then
+loads its own copy on first use.
+
+(gunicorn -k uvicorn.workers.UvicornWorker --preload app.server:app with
+PRELOAD_MODELS=true gives the same sharing.)
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+from dotenv import load_dotenv
+
+# Before the settings below, so .env applies to them as it does to the app
+load_dotenv()
+
+SERVE_PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "true").lower() == "true"
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "2"))
+# Torch intra-op threads per worker; by default the cores are split between workers
+MODEL_THREADS_PER_WORKER = int(os.getenv("MODEL_THREADS_PER_WORKER", "0"))
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _limit_model_threads(workers: int):
+    threads = MODEL_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // workers)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _run_worker(app, sock: socket.socket, workers: int):
+    import uvicorn
+
+    # Parent's handlers must not leak into the worker; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    _limit_model_threads(workers)
+    config = uvicorn.Config(app, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, workers: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(app, sock, workers)
+        except BaseException as e:
+            print(f"[serve] worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = SERVE_WORKERS,
+          preload: bool = SERVE_PRELOAD_MODELS):
+    # Read by app.model_preload when app.server is imported below
+    os.environ["PRELOAD_MODELS"] = "true" if preload else "false"
+    # With preload, importing the app loads the models in this process
+    from app.server import app
+    if not preload:
+        print("[serve] PRELOAD_MODELS=false: each worker loads its own copy of the models")
+
+    if not hasattr(os, "fork") or workers <= 1:
+        import uvicorn
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    sock = _bind(host, port)
+    # Keep the cyclic GC from touching (and so copying) every preloaded object in each worker
+    gc.collect()
+    gc.freeze()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    children = {_spawn(app, sock, workers) for _ in range(workers)}
+    print(f"[serve] {workers} workers on http://{host}:{port} (pids {sorted(children)})")
+    try:
+        while not stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.5)
+                continue
+            children.discard(pid)
+            if not stopping:
+                print(f"[serve] worker {pid} exited ({status}); restarting")
+                time.sleep(1)
+                children.add(_spawn(app, sock, workers))
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m app.serve", description="Pre-fork API server sharing preloaded models between workers."
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help="default: SERVE_WORKERS")
+    args = parser.parse_args()
+    serve(host=args.host, port=args.port, workers=args.workers)
@@ -1,41 +1,82 @@
+import asyncio
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from typing import List
 
 load_dotenv()
 
 from app.models import (
-    JobDescription,
     JobDescriptionRequest,
     MatchResponse,
     MatchResult
 )
 from app.refiner.hiring_pipeline import hiring_pipeline
-from app.performance_monitor import timing_decorator, perf_monitor
+from app.refiner.deadline import Deadline
+from app import llm_gateway
+from app import model_preload
+from app.parser import parse_job_description_request
+from app.resume_extractor import extract_skills
+from app.ingest_status import read_status
+from app.performance_monitor import (
+    timing_decorator,
+    perf_monitor,
+    RequestTrace,
+    current_trace,
+    export_trace
+)
 
 app = FastAPI(title="Talent Job Matching API", version="1.0",debug=True)
 
+# Load weights at import time: under python -m app.serve this runs once, before the workers fork
+if model_preload.PRELOAD_MODELS:
+    model_preload.preload_models()
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Each worker runs one inference per model before it accepts requests."""
+    if model_preload.PRELOAD_MODELS:
+        await asyncio.to_thread(model_preload.warm_up)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Talent Job Matching API. Server is running!"}
 
+@app.get("/api/v1/llm/stats")
+def llm_stats():
+    """Per-stage Gemini call, retry, latency and token counters since startup."""
+    return llm_gateway.get_stats()
+
+@app.get("/api/v1/ingest/status")
+def ingest_status():
+    """Ingest daemon backlog and file-to-searchable lag (written by python -m app.ingest_daemon)."""
+    return read_status() or {"running": False}
+
 @app.post("/api/v1/match/candidate", response_model=MatchResponse)
 @timing_decorator
-async def match_candidates(job: JobDescriptionRequest):
+async def match_candidates(job: JobDescriptionRequest, response: Response, include_timings: bool = False):
     import time
     start_time = time.time()
+
+    # Spans from every pipeline stage / LLM / model call land in this trace
+    trace = RequestTrace(name="match_candidates")
+    current_trace.set(trace)
     
-    job_full = JobDescription(
-        title="Unknown",
-        description=job.description,
-        required_skills=[]
-    )
+    deadline = Deadline()
+
+    # Structured JD: its required skills drive the JD-vs-candidate skill coverage score
+    job_full = await asyncio.to_thread(parse_job_description_request, job)
+    required_skills = list(job_full.required_skills)
+    if not required_skills:
+        # Parser fell back (no LLM / failure): skills the taxonomy recognizes in the text
+        required_skills = extract_skills(job.description.splitlines())
+        job_full = job_full.model_copy(update={"required_skills": required_skills})
     
     pipeline_start = time.time()
-    result = hiring_pipeline.invoke({
+    result = await hiring_pipeline.ainvoke({
         "description": job_full,
-        "job_requirements": []
+        "job_requirements": required_skills,
+        "deadline": deadline
     })
     pipeline_end = time.time()
     perf_monitor.record_metric("hiring_pipeline_execution", pipeline_end - pipeline_start)
@@ -53,7 +94,8 @@ async def match_candidates(job: JobDescriptionRequest):
                 score=cand.score,
                 skills_match=cand.skills_match,
                 reasoning=cand.ai_reasoning_short,
-                faithfulness_score=deep_dive.faithfulness_score
+                faithfulness_score=deep_dive.faithfulness_score,
+                missing=deep_dive.missing
             )
         )
     
@@ -62,10 +104,15 @@ async def match_candidates(job: JobDescriptionRequest):
     
     # Print performance report after processing
     perf_monitor.print_report()
+
+    trace.add("total", trace.started_at, time.perf_counter() - trace.started_at)
+    response.headers["Server-Timing"] = trace.server_timing()
+    export_trace(trace)
     
     return MatchResponse(
         total_candidates=len(candidates),
-        top_matches=final_matches
+        top_matches=final_matches,
+        timings=trace.stage_totals() if include_timings else None
     )
 
 if __name__ == "__main__":
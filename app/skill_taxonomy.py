@@ -0,0 +1,246 @@
+"""
+Skill Taxonomy
+Normalizes free-text skill names (casing, punctuation, synonyms) to stable
+integer skill IDs and stores a candidate's skills as a compact bitset, so
+JD-vs-candidate skill coverage is a single AND + popcount.
+"""
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TAXONOMY_PATH = os.getenv("SKILL_TAXONOMY_PATH", os.path.join(base_dir, "skill_taxonomy.json"))
+
+# canonical name -> known aliases (all lowercase)
+SKILL_SYNONYMS: Dict[str, List[str]] = {
+    "javascript": ["js", "java script", "ecmascript", "es6"],
+    "typescript": ["ts"],
+    "python": ["py", "python3", "python 3"],
+    "java": [],
+    "c++": ["cpp", "c plus plus"],
+    "c#": ["csharp", "c sharp"],
+    "go": ["golang"],
+    "html": ["html5"],
+    "css": ["css3"],
+    "sql": [],
+    "postgresql": ["postgres", "psql"],
+    "mysql": [],
+    "mongodb": ["mongo"],
+    "react": ["reactjs", "react.js", "react js"],
+    "vue": ["vuejs", "vue.js", "vue js"],
+    "angular": ["angularjs", "angular.js"],
+    "node.js": ["node", "nodejs", "node js"],
+    "django": [],
+    "flask": [],
+    "fastapi": ["fast api"],
+    "rest api": ["rest", "restful", "rest apis", "restful apis"],
+    "docker": [],
+    "kubernetes": ["k8s"],
+    "aws": ["amazon web services"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "azure": ["microsoft azure"],
+    "machine learning": ["ml"],
+    "deep learning": ["dl"],
+    "natural language processing": ["nlp"],
+    "wordpress": ["wp"],
+    "php": [],
+    "git": [],
+}
+
+# How seed skills are shown (skills_match); other skills keep the casing they were first seen with
+SKILL_DISPLAY_NAMES: Dict[str, str] = {
+    "javascript": "JavaScript", "typescript": "TypeScript", "python": "Python", "java": "Java",
+    "c++": "C++", "c#": "C#", "go": "Go", "html": "HTML", "css": "CSS", "sql": "SQL",
+    "postgresql": "PostgreSQL", "mysql": "MySQL", "mongodb": "MongoDB", "react": "React",
+    "vue": "Vue", "angular": "Angular", "node.js": "Node.js", "django": "Django", "flask": "Flask",
+    "fastapi": "FastAPI", "rest api": "REST API", "docker": "Docker", "kubernetes": "Kubernetes",
+    "aws": "AWS", "gcp": "GCP", "azure": "Azure", "machine learning": "Machine Learning",
+    "deep learning": "Deep Learning", "natural language processing": "Natural Language Processing",
+    "wordpress": "WordPress", "php": "PHP", "git": "Git",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_skill(skill: str) -> str:
+    """Lowercase, trim and collapse whitespace; keeps '+', '#' and '.' (c++, c#, node.js)."""
+    return display_form(skill).lower()
+
+
+def display_form(skill: str) -> str:
+    """normalize_skill without lowercasing: the surface form shown to users."""
+    text = _WHITESPACE.sub(" ", str(skill).strip())
+    return text.strip(" ,;:|-•*()[]{}'\"")
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def coverage(required_bits: int, candidate_bits: int, required_count: Optional[int] = None) -> float:
+    """
+    Fraction of required skills present in the candidate bitset.
+    required_count is the number of distinct required skills including ones the
+    taxonomy does not know (they have no bit, so they count as unmet).
+    """
+    required = max(popcount(required_bits), required_count or 0)
+    if not required:
+        return 0.0
+    return popcount(required_bits & candidate_bits) / required
+
+
+def bits_to_hex(bits: int) -> str:
+    # Chroma metadata only holds 64-bit ints, so the bitset is stored as hex
+    return format(bits, "x")
+
+
+def bits_from_hex(value) -> int:
+    if not value:
+        return 0
+    try:
+        return int(str(value), 16)
+    except ValueError:
+        return 0
+
+
+class SkillTaxonomy:
+    """
+    Maps skills to integer IDs. The seed synonyms get the first IDs; unseen
+    skills are appended at ingest time and persisted, so IDs stay stable
+    across runs and the bitsets stored on chunks remain valid.
+    """
+
+    def __init__(self, path: Optional[str] = TAXONOMY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        # canonical name -> display name
+        self._display: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        self._dirty = False
+
+        for canonical, aliases in SKILL_SYNONYMS.items():
+            self._register(self._names, self._ids, self._display, canonical)
+            for alias in aliases:
+                self._aliases[alias] = canonical
+
+        if path and os.path.exists(path):
+            self._load()
+
+    @staticmethod
+    def _register(names: List[str], ids: Dict[str, int], display: Dict[str, str], canonical: str,
+                  display_name: Optional[str] = None) -> int:
+        if canonical not in ids:
+            ids[canonical] = len(names)
+            names.append(canonical)
+            display[canonical] = display_name or SKILL_DISPLAY_NAMES.get(canonical, canonical)
+        return ids[canonical]
+
+    def _load(self):
+        """Rereads the persisted taxonomy and swaps it in under the lock."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Failed to load skill taxonomy from {self.path}: {e}")
+            return
+
+        # Persisted order is authoritative for IDs. Built aside, so lock-free
+        # readers see either the old or the new mapping, never a partial one
+        names: List[str] = []
+        ids: Dict[str, int] = {}
+        display: Dict[str, str] = {}
+        saved_display = data.get("display", {})
+        for name in data.get("skills", []):
+            self._register(names, ids, display, name, saved_display.get(name))
+        for canonical in SKILL_SYNONYMS:
+            self._register(names, ids, display, canonical)
+
+        with self._lock:
+            if self._dirty:
+                # This process added skills that are not saved yet; its IDs must not move
+                return
+            self._names, self._ids, self._display = names, ids, display
+            self._aliases = {**self._aliases, **data.get("aliases", {})}
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"skills": self._names, "aliases": self._aliases, "display": self._display}, f, indent=2
+                )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def canonical(self, skill: str) -> str:
+        name = normalize_skill(skill)
+        return self._aliases.get(name, name)
+
+    def distinct(self, skills: Iterable[str]) -> set:
+        """Distinct canonical names of the skills, known to the taxonomy or not."""
+        return {name for name in (self.canonical(skill) for skill in skills or []) if name}
+
+    def display_name(self, skill: str) -> str:
+        """Display name of the skill's canonical form (e.g. "postgres" -> "PostgreSQL")."""
+        name = self.canonical(skill)
+        return self._display.get(name) or SKILL_DISPLAY_NAMES.get(name) or display_form(skill)
+
+    def skill_id(self, skill: str, add: bool = False) -> Optional[int]:
+        name = self.canonical(skill)
+        if not name:
+            return None
+        skill_id = self._ids.get(name)
+        if skill_id is None and add:
+            with self._lock:
+                skill_id = self._ids.get(name)
+                if skill_id is None:
+                    # An alias's casing says nothing about the canonical name's ("K8s" -> kubernetes)
+                    surface = display_form(skill)
+                    skill_id = self._register(
+                        self._names, self._ids, self._display, name,
+                        surface if surface.lower() == name else None
+                    )
+                    self._dirty = True
+        return skill_id
+
+    def encode(self, skills: Iterable[str], add: bool = False) -> int:
+        bits = 0
+        for skill in skills or []:
+            skill_id = self.skill_id(skill, add=add)
+            if skill_id is not None:
+                bits |= 1 << skill_id
+        return bits
+
+    def decode(self, bits: int) -> List[str]:
+        """Display names of the skills in a bitset."""
+        if bits.bit_length() > len(self._names) and self.path and os.path.exists(self.path):
+            # Bitset written by a newer ingest run than this process has seen
+            self._load()
+        known, display = self._names, self._display
+        names = []
+        idx = 0
+        while bits:
+            if bits & 1 and idx < len(known):
+                names.append(display.get(known[idx], known[idx]))
+            bits >>= 1
+            idx += 1
+        return names
+
+    def lookup(self, term: str) -> Optional[str]:
+        """Canonical name if the (normalized) term is a known skill or alias, else None."""
+        name = self._aliases.get(term, term)
+        return name if name in self._ids else None
+
+    def has_skill(self, bits: int, skill: str) -> bool:
+        skill_id = self.skill_id(skill)
+        return skill_id is not None and bool(bits >> skill_id & 1)
+
+
+# Shared instance used by ingest, search and the refiner
+taxonomy = SkillTaxonomy()
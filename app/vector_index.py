@@ -0,0 +1,516 @@
+"""
+In-process vector index (VECTOR_BACKEND=local).
+
+Chunk embeddings live in one flat float32 file that is memory-mapped
+read-only for search, so every uvicorn worker on a host shares the same
+page-cache copy instead of each holding its own. Ids, documents and metadata
+live in a SQLite side store. Search is an exact inner-product scan (the
+embeddings are normalized, so this is cosine similarity), equivalent to a
+FAISS IndexFlatIP but without copying the vectors into each process.
+
+With VECTOR_QUANTIZATION=int8 (scalar quantization, per-row scale) or
+float16, a compressed copy of the vectors is kept next to the float32 file.
+Search scans the compressed copy and rescores only the best
+k * VECTOR_RESCORE_FACTOR rows against the exact float32 vectors, so the
+file that has to stay resident in RAM is 4x (int8) or 2x (float16) smaller;
+the float32 file is then not mapped at all, only read row by row.
+
+The vector file is append-only: an upsert tombstones the old row and appends
+a new one, and `compact` rewrites the file without the dead rows. Writers
+(ingest, the daemon) are serialized by SQLite's write lock. Readers pick up
+new rows and deletions through a generation counter, without restarting.
+
+    python -m app.vector_index migrate    # copy chroma_db into the local index
+    python -m app.vector_index compact    # drop tombstoned rows (run offline)
+    python -m app.vector_index quantize   # build the compressed copy for an existing index
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from app.performance_monitor import span
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", os.path.join(base_dir, "vector_index"))
+# none | float16 | int8
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+# Rows rescored with exact float32 vectors: k * this factor
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+
+_VECTORS_FILE = "vectors.f32"
+_META_FILE = "meta.sqlite"
+_MAX_PARAMS = 900
+# mode -> (file, dtype) of the compressed copy; int8 also keeps one float32 scale per row
+_QUANTIZED_FILES = {"float16": ("vectors.f16", np.float16), "int8": ("vectors.i8", np.int8)}
+_SCALES_FILE = "scales.f32"
+# Rows converted to float32 at a time while scanning compressed vectors; small
+# enough that the conversion buffer stays in CPU cache
+_SCAN_BLOCK = 512
+# Rows per write when (re)building files from the float32 vectors
+_COPY_BLOCK = 65536
+
+
+def quantize(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(codes, per-row scales) for float16 or int8; int8 scores are scale * (codes . query)."""
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _write_rows(path: str, start: int, array: np.ndarray):
+    row_bytes = array.itemsize * (array.shape[1] if array.ndim > 1 else 1)
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.seek(start * row_bytes)
+        f.write(np.ascontiguousarray(array).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class LocalVectorIndex(VectorStore):
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        path: str = VECTOR_INDEX_PATH,
+        quantization: str = VECTOR_QUANTIZATION,
+        rescore_factor: int = VECTOR_RESCORE_FACTOR
+    ):
+        if quantization not in ("none", *_QUANTIZED_FILES):
+            raise ValueError(f"Unknown VECTOR_QUANTIZATION {quantization!r}")
+        self._embedding_function = embedding_function
+        self.path = path
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, _VECTORS_FILE)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, _META_FILE), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                candidate_id TEXT,
+                document TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_id ON chunks(id, deleted)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_candidate ON chunks(candidate_id, deleted)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        if not os.path.exists(self._vectors_path):
+            open(self._vectors_path, "wb").close()
+
+        # Read-side view: rows [0, _rows) of the memory map, alive mask, generation seen
+        self._generation = -1
+        self._rows = 0
+        self._dim = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._vectors_file = None
+        self._warned_unquantized = False
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    # ---------- State ----------
+
+    def _state(self, key: str, default: int = 0) -> int:
+        row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, key: str, value: int):
+        self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 0").fetchone()[0]
+
+    # ---------- Writes ----------
+
+    def upsert_vectors(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        documents: Optional[List[str]] = None
+    ):
+        """Bulk write of precomputed vectors (same arguments as a Chroma collection upsert)."""
+        if not ids:
+            return
+        vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or ["" for _ in ids]
+
+        with self._lock:
+            # BEGIN IMMEDIATE takes SQLite's write lock, so concurrent writer
+            # processes allocate disjoint rows of the vector file
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                dim = self._state("dim")
+                if dim and vectors.shape[1] != dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {dim}")
+                start = self._state("rows")
+                self._tombstone(ids)
+
+                # Vectors hit the files before the row count that makes them visible
+                _write_rows(self._vectors_path, start, vectors)
+                if self.quantization != "none" and self._state(f"{self.quantization}_rows", -1) != start:
+                    self._build_quantized(self.quantization, start)
+                for mode in _QUANTIZED_FILES:
+                    # Keep every complete compressed copy in step, whatever this writer is configured for
+                    if self._state(f"{mode}_rows", -1) == start:
+                        self._write_quantized(mode, start, vectors)
+                        self._set_state(f"{mode}_rows", start + len(ids))
+
+                self._conn.executemany(
+                    "INSERT INTO chunks (row, id, candidate_id, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (start + offset, chunk_id, (meta or {}).get("candidate_id"), doc or "", json.dumps(meta or {}))
+                        for offset, (chunk_id, meta, doc) in enumerate(zip(ids, metadatas, documents))
+                    ]
+                )
+                self._set_state("dim", vectors.shape[1])
+                self._set_state("rows", start + len(ids))
+                self._set_state("generation", self._state("generation") + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _write_quantized(self, mode: str, start: int, vectors: np.ndarray):
+        codes, scales = quantize(vectors, mode)
+        _write_rows(os.path.join(self.path, _QUANTIZED_FILES[mode][0]), start, codes)
+        if scales is not None:
+            _write_rows(os.path.join(self.path, _SCALES_FILE), start, scales)
+
+    def _build_quantized(self, mode: str, rows: int):
+        """(Re)writes the compressed copy of rows [0, rows) from the float32 file. Caller holds the write lock."""
+        for name in (_QUANTIZED_FILES[mode][0], _SCALES_FILE if mode == "int8" else None):
+            if name and os.path.exists(os.path.join(self.path, name)):
+                os.remove(os.path.join(self.path, name))
+        dim = self._state("dim")
+        if rows and dim:
+            matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+            for start in range(0, rows, _COPY_BLOCK):
+                self._write_quantized(mode, start, np.asarray(matrix[start:start + _COPY_BLOCK]))
+            del matrix
+        self._set_state(f"{mode}_rows", rows)
+
+    def _tombstone(self, ids: List[str]):
+        for start in range(0, len(ids), _MAX_PARAMS):
+            batch = ids[start:start + _MAX_PARAMS]
+            self._conn.execute(
+                f"UPDATE chunks SET deleted = 1 WHERE deleted = 0 AND id IN ({', '.join('?' * len(batch))})",
+                batch
+            )
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        with span("model.embed"):
+            vectors = self._embedding_function.embed_documents(texts)
+        self.upsert_vectors(list(ids), vectors, metadatas, texts)
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, **kwargs: Any) -> Optional[bool]:
+        """Deletes by chunk id, or by metadata equality (`where`, as Chroma accepts it)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if ids:
+                    self._tombstone(list(ids))
+                if where:
+                    clause, params = self._where_sql(where)
+                    self._conn.execute(f"UPDATE chunks SET deleted = 1 WHERE deleted = 0 AND {clause}", params)
+                self._set_state("generation", self._state("generation") + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    @staticmethod
+    def _where_sql(where: dict) -> Tuple[str, list]:
+        clauses, params = [], []
+        for key, value in where.items():
+            if key == "candidate_id":
+                clauses.append("candidate_id = ?")
+                params.append(str(value))
+            else:
+                clauses.append("json_extract(metadata, ?) = ?")
+                params.extend([f"$.{key}", value])
+        return " AND ".join(clauses) or "1", params
+
+    # ---------- Reads ----------
+
+    def _refresh(self):
+        """Remaps the vector file and reloads the alive mask when a writer changed the index."""
+        # One read transaction: a writer committing mid-refresh must not make the
+        # alive rows disagree with the row count (WAL readers see a fixed snapshot)
+        self._conn.execute("BEGIN")
+        try:
+            generation = self._state("generation")
+            if generation == self._generation:
+                return
+            rows, dim = self._state("rows"), self._state("dim")
+            quantized_rows = self._state(f"{self.quantization}_rows", -1)
+            alive_rows = [row[0] for row in self._conn.execute("SELECT row FROM chunks WHERE deleted = 0")]
+        finally:
+            self._conn.execute("COMMIT")
+        if self._vectors_file is not None:
+            self._vectors_file.close()
+        # Reopened every time: compact replaces the file
+        self._vectors_file = open(self._vectors_path, "rb", buffering=0)
+        if rows and dim:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+            alive = np.zeros(rows, dtype=bool)
+            alive[alive_rows] = True
+            self._alive = alive
+        else:
+            self._matrix, self._alive = None, None
+        self._codes, self._scales = None, None
+        if rows and dim and self.quantization != "none":
+            if quantized_rows == rows:
+                name, dtype = _QUANTIZED_FILES[self.quantization]
+                self._codes = np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=(rows, dim))
+                if self.quantization == "int8":
+                    self._scales = np.memmap(
+                        os.path.join(self.path, _SCALES_FILE), dtype=np.float32, mode="r", shape=(rows,)
+                    )
+                # Only rescoring reads float32 rows; mapping the file would fault in far more than those rows
+                self._matrix = None
+            elif not self._warned_unquantized:
+                print(f"No {self.quantization} copy of the vector index yet; scanning float32 "
+                      f"(build it with: python -m app.vector_index quantize)")
+                self._warned_unquantized = True
+        self._rows, self._dim, self._generation = rows, dim, generation
+
+    def _candidate_rows(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        if not filter:
+            return None
+        clause, params = self._where_sql(filter)
+        rows = self._conn.execute(f"SELECT row FROM chunks WHERE deleted = 0 AND {clause}", params).fetchall()
+        return np.array([row[0] for row in rows if row[0] < self._rows], dtype=np.int64)
+
+    def _read_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Exact float32 vectors of a few rows, read directly from the vector file."""
+        row_bytes = self._dim * 4
+        vectors = np.empty((len(rows), self._dim), dtype=np.float32)
+        for i, row in enumerate(rows):
+            self._vectors_file.seek(int(row) * row_bytes)
+            vectors[i] = np.frombuffer(self._vectors_file.read(row_bytes), dtype=np.float32)
+        return vectors
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k best finite scores, best first."""
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def _scan_quantized(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate scores over the compressed copy, then exact float32 rescoring of the shortlist."""
+        scores = np.empty(self._rows, dtype=np.float32)
+        buffer = np.empty((_SCAN_BLOCK, self._dim), dtype=np.float32)
+        for start in range(0, self._rows, _SCAN_BLOCK):
+            block = self._codes[start:start + _SCAN_BLOCK]
+            converted = buffer[:len(block)]
+            converted[...] = block
+            np.dot(converted, query, out=scores[start:start + len(block)])
+        if self._scales is not None:
+            scores *= self._scales
+        scores[~self._alive] = -np.inf
+
+        # Sorted rows keep the reads of the float32 file sequential
+        shortlist = np.sort(self._top_k(scores, k * self.rescore_factor))
+        exact = self._read_rows(shortlist) @ query
+        top = self._top_k(exact, k)
+        return shortlist[top], exact[top]
+
+    def _scan(self, query: np.ndarray, k: int, rows: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (rows, scores) by inner product over the alive rows (or the given subset)."""
+        if rows is None and self._codes is not None:
+            return self._scan_quantized(query, k)
+        if rows is None:
+            scores = self._matrix @ query
+            scores[~self._alive] = -np.inf
+            candidates = np.arange(self._rows)
+        else:
+            scores = self._read_rows(rows) @ query
+            candidates = rows
+        top = self._top_k(scores, k)
+        return candidates[top], scores[top]
+
+    def _documents(self, rows: np.ndarray) -> dict:
+        found = {}
+        row_list = [int(row) for row in rows]
+        for start in range(0, len(row_list), _MAX_PARAMS):
+            batch = row_list[start:start + _MAX_PARAMS]
+            for row, chunk_id, document, metadata in self._conn.execute(
+                f"SELECT row, id, document, metadata FROM chunks WHERE row IN ({', '.join('?' * len(batch))})", batch
+            ):
+                found[row] = Document(id=chunk_id, page_content=document, metadata=json.loads(metadata))
+        return found
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        query = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._refresh()
+            if not self._rows or not self._dim:
+                return []
+            with span("vector.scan"):
+                rows, scores = self._scan(query, k, self._candidate_rows(filter))
+            documents = self._documents(rows)
+        return [(documents[int(row)], float(score)) for row, score in zip(rows, scores) if int(row) in documents]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        with span("model.embed"):
+            embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities of normalized embeddings
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        path: str = VECTOR_INDEX_PATH,
+        **kwargs: Any
+    ) -> "LocalVectorIndex":
+        index = cls(embedding, path=path)
+        index.add_texts(texts, metadatas=metadatas, ids=ids)
+        return index
+
+    # ---------- Maintenance ----------
+
+    def compact(self):
+        """Rewrites the vector file without tombstoned rows. Stop the API workers first: rows are renumbered."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows, dim = self._state("rows"), self._state("dim")
+                alive = [row[0] for row in self._conn.execute("SELECT row FROM chunks WHERE deleted = 0 ORDER BY row")]
+                tmp_path = f"{self._vectors_path}.tmp"
+                if rows and dim:
+                    matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+                    with open(tmp_path, "wb") as f:
+                        for start in range(0, len(alive), _COPY_BLOCK):
+                            f.write(np.ascontiguousarray(matrix[alive[start:start + _COPY_BLOCK]]).tobytes())
+                    del matrix
+                else:
+                    open(tmp_path, "wb").close()
+
+                self._conn.execute("DELETE FROM chunks WHERE deleted = 1")
+                self._conn.execute("UPDATE chunks SET row = -row - 1")
+                self._conn.executemany(
+                    "UPDATE chunks SET row = ? WHERE row = ?", [(new, -old - 1) for new, old in enumerate(alive)]
+                )
+                os.replace(tmp_path, self._vectors_path)
+                self._set_state("rows", len(alive))
+                for mode in _QUANTIZED_FILES:
+                    if self._state(f"{mode}_rows", -1) >= 0:
+                        self._build_quantized(mode, len(alive))
+                self._set_state("generation", self._state("generation") + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        print(f"Compacted vector index: {rows} -> {len(alive)} rows")
+
+    def build_quantized(self):
+        """Builds the compressed copy for the configured VECTOR_QUANTIZATION from the existing vectors."""
+        if self.quantization == "none":
+            raise ValueError("Set VECTOR_QUANTIZATION to float16 or int8 first")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._state("rows")
+                self._build_quantized(self.quantization, rows)
+                self._set_state("generation", self._state("generation") + 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        print(f"Built {self.quantization} copy of {rows} vectors")
+
+
+def migrate_from_chroma(target: LocalVectorIndex, chroma_store, batch_size: int = 5000) -> int:
+    """Copies ids, embeddings, documents and metadata out of a Chroma collection without re-embedding."""
+    collection = chroma_store._collection
+    total = collection.count()
+    copied = 0
+    for offset in range(0, total, batch_size):
+        batch = collection.get(
+            limit=batch_size, offset=offset, include=["embeddings", "metadatas", "documents"]
+        )
+        target.upsert_vectors(batch["ids"], batch["embeddings"], batch["metadatas"], batch["documents"])
+        copied += len(batch["ids"])
+        print(f"  -> Migrated {copied}/{total} chunks")
+    return copied
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.vector_store import get_chroma_store, get_embedding_model
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        index = LocalVectorIndex(get_embedding_model())
+        count = migrate_from_chroma(index, get_chroma_store())
+        print(f"Migrated {count} chunks to {index.path}; set VECTOR_BACKEND=local to use it")
+    elif command == "compact":
+        LocalVectorIndex(get_embedding_model()).compact()
+    elif command == "quantize":
+        LocalVectorIndex(get_embedding_model()).build_quantized()
+    else:
+        print("usage: python -m app.vector_index [migrate|compact|quantize]")
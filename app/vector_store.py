@@ -1,38 +1,71 @@
 import os
+import threading
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 
 # Define paths
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 VECTOR_DB_PATH = os.path.join(base_dir, "chroma_db")
+# Model-level batch inside each embed_documents call; larger is faster on CPU for bulk ingest
+EMBED_ENCODE_BATCH_SIZE = int(os.getenv("EMBED_ENCODE_BATCH_SIZE", "64"))
+# "chroma" (default) or "local": the in-process memory-mapped index in app.vector_index
+# (copy an existing chroma_db over with: python -m app.vector_index migrate)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
 
-# Lazy-loaded singleton
+# Lazy-loaded singletons. Double-checked under a lock so concurrent first
+# requests (threadpool endpoints, to_thread calls) build each one only once;
+# reentrant because the stores build the embedding model
 _vectorstore = None
 _embedding_model = None
+_chroma_store = None
+_init_lock = threading.RLock()
+
+def get_embedding_model():
+    global _embedding_model
+
+    if _embedding_model is None:
+        with _init_lock:
+            if _embedding_model is None:
+                print("Loading embedding model...")
+                _embedding_model = HuggingFaceEmbeddings(
+                    model_name="all-MiniLM-L6-v2",
+                    model_kwargs={'device': 'cpu'},  # Specify device to optimize performance
+                    encode_kwargs={'normalize_embeddings': True, 'batch_size': EMBED_ENCODE_BATCH_SIZE}  # Optimize encoding
+                )
+    return _embedding_model
+
+def get_chroma_store():
+    global _chroma_store
+
+    if _chroma_store is None:
+        with _init_lock:
+            if _chroma_store is None:
+                # Initialize Chroma with optimized settings
+                _chroma_store = Chroma(
+                    persist_directory=VECTOR_DB_PATH,
+                    embedding_function=get_embedding_model(),
+                    collection_name="candidate_profiles"
+                )
+    return _chroma_store
 
 def get_vectorstore():
     """
-    Returns the ChromaDB vector store instance.
+    Returns the vector store of the configured backend (VECTOR_BACKEND).
     Uses lazy loading to avoid slow startup.
     """
-    global _vectorstore, _embedding_model
+    global _vectorstore
     
     if _vectorstore is None:
-        print("Initializing Vector Store...")
-        # Initialize embedding model
-        _embedding_model = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},  # Specify device to optimize performance
-            encode_kwargs={'normalize_embeddings': True}  # Optimize encoding
-        )
-        
-        # Initialize Chroma with optimized settings
-        _vectorstore = Chroma(
-            persist_directory=VECTOR_DB_PATH,
-            embedding_function=_embedding_model,
-            collection_name="candidate_profiles"
-        )
-        print(f"Vector Store ready at: {VECTOR_DB_PATH}")
+        with _init_lock:
+            if _vectorstore is None:
+                print("Initializing Vector Store...")
+                if VECTOR_BACKEND == "local":
+                    from app.vector_index import LocalVectorIndex
+                    store = LocalVectorIndex(get_embedding_model())
+                    print(f"Vector Store ready at: {store.path}")
+                else:
+                    store = get_chroma_store()
+                    print(f"Vector Store ready at: {VECTOR_DB_PATH}")
+                _vectorstore = store
     
     return _vectorstore
-
@@ -0,0 +1,99 @@
+"""
+Write-behind buffer for ingest.
+Gathers chunks across many files, embeds them in large batches with
+embed_documents and upserts them into the vector store in bulk, instead of
+one small add_documents call (and embedding batch) per file.
+"""
+import atexit
+import os
+import threading
+from typing import Callable, List, Optional
+
+from langchain_core.documents import Document
+
+from app.performance_monitor import span
+
+# Texts per embed_documents call
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "512"))
+# Chunks buffered before a flush; bounds ingest memory
+WRITE_BUFFER_CHUNKS = int(os.getenv("INGEST_WRITE_BATCH", "1024"))
+# Chroma rejects larger upserts (its own limit is ~5461 on SQLite)
+VECTOR_STORE_MAX_BATCH = int(os.getenv("VECTOR_STORE_MAX_BATCH", "5000"))
+
+
+def upsert_documents(vectorstore, ids: List[str], documents: List[Document], embed_batch_size: int = EMBED_BATCH_SIZE):
+    """Embeds in large batches and bulk-upserts; falls back to add_documents for other stores."""
+    embeddings = getattr(vectorstore, "embeddings", None)
+    # LocalVectorIndex takes vectors directly; for Chroma, go to its collection
+    upsert = getattr(vectorstore, "upsert_vectors", None)
+    if upsert is None and getattr(vectorstore, "_collection", None) is not None:
+        upsert = vectorstore._collection.upsert
+    if embeddings is None or upsert is None:
+        vectorstore.add_documents(documents, ids=ids)
+        return
+
+    texts = [doc.page_content for doc in documents]
+    vectors = []
+    for start in range(0, len(texts), embed_batch_size):
+        with span("model.embed"):
+            vectors.extend(embeddings.embed_documents(texts[start:start + embed_batch_size]))
+
+    for start in range(0, len(ids), VECTOR_STORE_MAX_BATCH):
+        end = start + VECTOR_STORE_MAX_BATCH
+        with span("vector.upsert"):
+            upsert(
+                ids=ids[start:end],
+                embeddings=vectors[start:end],
+                metadatas=[doc.metadata for doc in documents[start:end]],
+                documents=texts[start:end]
+            )
+
+
+class VectorWriteBuffer:
+    """
+    Buffers whole files (IngestItems) and hands them to `commit` in one call once
+    `max_chunks` chunks are pending. Flushed on close() and at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        commit: Callable[[list], None],
+        max_chunks: int = WRITE_BUFFER_CHUNKS,
+        on_flush: Optional[Callable[[list, Optional[Exception]], None]] = None
+    ):
+        self.commit = commit
+        self.max_chunks = max(1, max_chunks)
+        self.on_flush = on_flush
+        self._items = []
+        self._chunks = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def add(self, item):
+        with self._lock:
+            self._items.append(item)
+            self._chunks += len(item.splits)
+            if self._chunks >= self.max_chunks:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._items:
+            return
+        items, self._items, self._chunks = self._items, [], 0
+        error = None
+        try:
+            self.commit(items)
+        except Exception as e:
+            names = ", ".join(item.filename for item in items)
+            print(f"  -> Error saving to DB for {names}: {e}")
+            error = e
+        if self.on_flush is not None:
+            self.on_flush(items, error)
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.close)
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.rate_limit import ConcurrencyLimiter
+
+
+def test_cancel_after_hand_over_returns_the_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1)
+        await limiter.aacquire()
+        waiter = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0)
+
+        limiter.release()
+        # _hand_over runs and resolves the waiter's future; the task has not resumed yet
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert limiter._available == 1
+        assert not limiter._waiters
+        await asyncio.wait_for(limiter.aacquire(), timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_while_queued_keeps_the_slot_count():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1)
+        await limiter.aacquire()
+        waiter = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        limiter.release()
+        assert limiter._available == 1
+        await asyncio.wait_for(limiter.aacquire(), timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_sync_and_async_callers_share_the_cap():
+    async def scenario():
+        limiter = ConcurrencyLimiter(2)
+        active, peak = 0, 0
+
+        async def task():
+            nonlocal active, peak
+            await limiter.aacquire()
+            try:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.001)
+            finally:
+                active -= 1
+                limiter.release()
+
+        def thread_caller():
+            for _ in range(10):
+                limiter.acquire()
+                limiter.release()
+
+        await asyncio.gather(asyncio.to_thread(thread_caller), *(task() for _ in range(20)))
+        assert peak <= 2
+        assert limiter._available == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+from datetime import date
+
+from app.resume_extractor import extract_local, extract_skills
+
+HEADER = "John Smith\nSenior Backend Engineer\nExperience\nAcme | Mar 2015 - Present\n"
+
+
+def test_one_skill_is_not_confident():
+    extraction = extract_local(HEADER + "Skills\nPython\n", today=date(2026, 1, 1))
+
+    assert extraction.metadata.top_skills == ["Python"]
+    assert extraction.metadata.name == "John Smith"
+    assert extraction.metadata.years_of_experience == 10
+    assert not extraction.is_confident
+
+
+def test_full_profile_is_confident():
+    extraction = extract_local(
+        HEADER + "Skills\nPython, Docker, Kubernetes, AWS, PostgreSQL\n", today=date(2026, 1, 1)
+    )
+
+    assert extraction.is_confident
+
+
+def test_ambiguous_alias_inside_a_phrase_is_not_a_skill():
+    assert extract_skills(["Skills: Go to market, SEO, Content"]) == []
+
+
+def test_ambiguous_alias_as_a_whole_list_item_is_a_skill():
+    assert extract_skills(["Languages: Go, Python, Docker"]) == ["Go", "Python", "Docker"]
+    assert extract_skills(["I like to go running, hiking, swimming"]) == []
@@ -0,0 +1,40 @@
+from app.models import CandidateCard
+from app.refiner.scorer import calculate_match_scores
+from app.skill_taxonomy import coverage, taxonomy
+
+
+def _candidate(skills):
+    return CandidateCard(
+        candidate_id="c1",
+        name="Test Candidate",
+        current_title="Engineer",
+        company="",
+        years_experience=5,
+        seniority_level="Unknown",
+        score=0.5,
+        skills_match=skills,
+        skill_bitset=taxonomy.encode(skills),
+        ai_reasoning_short=""
+    )
+
+
+def test_unknown_required_skill_counts_as_unmet():
+    # Skills no resume has introduced to the taxonomy yet have no bit
+    required = ["Python", "Rustacean Frameworks", "Kafka Streams Pro"]
+    assert taxonomy.encode(["Rustacean Frameworks"]) == 0
+
+    candidate = _candidate(["Python", "Docker"])
+    required_bits = taxonomy.encode(required)
+    assert coverage(required_bits, candidate.skill_bitset, len(taxonomy.distinct(required))) == 1 / 3
+
+    scored = calculate_match_scores([candidate], required)[0]
+    assert "Skills=0.33" in scored.ai_reasoning_short
+
+
+def test_only_unknown_required_skills_score_zero_not_breadth():
+    scored = calculate_match_scores([_candidate(["Python", "Docker"])], ["Rustacean Frameworks"])[0]
+    assert "Skills=0.00" in scored.ai_reasoning_short
+
+
+def test_aliases_count_once():
+    assert taxonomy.distinct(["Postgres", "PostgreSQL", "psql"]) == {"postgresql"}
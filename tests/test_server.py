@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+# The API module imports the whole search / rerank stack
+for _module in ("fastapi.testclient", "sentence_transformers", "langchain_chroma",
+                "langchain_huggingface", "langchain_classic", "langchain_community"):
+    pytest.importorskip(_module)
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+from fastapi.testclient import TestClient
+
+from app import server
+from app.models import CandidateCard, CandidateDeepDive, ExplainabilityAnalysis, JobDescription
+from app.refiner.scorer import calculate_match_scores
+from app.skill_taxonomy import taxonomy
+
+JD_TEXT = "Backend engineer to build Python services on Kafka; Docker a plus."
+
+
+class _ScoringPipeline:
+    """Stands in for search / rerank / explain; runs the real scorer on one candidate."""
+
+    def __init__(self):
+        self.inputs = None
+
+    async def ainvoke(self, x):
+        self.inputs = x
+        card = CandidateCard(
+            candidate_id="c1",
+            name="Test Candidate",
+            current_title="Engineer",
+            company="",
+            years_experience=5,
+            seniority_level="Unknown",
+            score=0.5,
+            skills_match=["Python", "Docker"],
+            skill_bitset=taxonomy.encode(["Python", "Docker"]),
+            ai_reasoning_short=""
+        )
+        deep_dive = CandidateDeepDive(
+            candidate_id="c1",
+            explainability=ExplainabilityAnalysis(why_match_summary=""),
+            is_trustworthy=False
+        )
+        return {"candidates": calculate_match_scores([card], x["job_requirements"]), "deep_dives": [deep_dive]}
+
+
+def _match(monkeypatch, required_skills):
+    pipeline = _ScoringPipeline()
+    monkeypatch.setattr(
+        server, "parse_job_description_request",
+        lambda request: JobDescription(title="Backend Engineer", description=request.description,
+                                       required_skills=required_skills)
+    )
+    monkeypatch.setattr(server, "hiring_pipeline", pipeline)
+    response = TestClient(server.app).post("/api/v1/match/candidate", json={"description": JD_TEXT})
+    assert response.status_code == 200
+    return pipeline, response.json()
+
+
+def test_parsed_required_skills_drive_coverage(monkeypatch):
+    pipeline, body = _match(monkeypatch, ["Python", "Kafka Streams Pro"])
+
+    assert pipeline.inputs["job_requirements"] == ["Python", "Kafka Streams Pro"]
+    assert pipeline.inputs["description"].required_skills == ["Python", "Kafka Streams Pro"]
+    # 1 of 2 required skills, not the skills_match breadth fallback (2/5)
+    assert "Skills=0.50" in body["top_matches"][0]["reasoning"]
+
+
+def test_taxonomy_skills_from_text_when_parser_finds_none(monkeypatch):
+    pipeline, body = _match(monkeypatch, [])
+
+    assert pipeline.inputs["job_requirements"] == ["Python", "Docker"]
+    assert "Skills=1.00" in body["top_matches"][0]["reasoning"]
@@ -0,0 +1,183 @@
+"""
+Vector backend benchmark: query latency, memory and recall of Chroma vs the
+in-process memory-mapped index (app.vector_index), exact and quantized.
+
+    python vector_benchmark.py [--queries 200] [--k 15] [--skip-chroma]
+
+Run `python -m app.vector_index migrate` first so both backends hold the same
+chunks. The local index is benchmarked on a scratch copy, where the float16 /
+int8 copies are built, so the live index does not gain compressed copies its
+writers would then have to keep up to date. Each backend is measured in its
+own subprocess, so RSS is not skewed by the others; queries are stored vectors
+(with a little noise), so the embedding model is not loaded or timed.
+Recall@k is measured against the exact float32 scan of the local index.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def rss_mb() -> float:
+    """Resident set size of this process (Linux /proc; falls back to peak RSS)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def scratch_copy(target_dir: str) -> str:
+    """Copies the local index into target_dir (SQLite via the backup API, so the WAL is included)."""
+    from app.vector_index import VECTOR_INDEX_PATH, _META_FILE
+
+    if not os.path.exists(os.path.join(VECTOR_INDEX_PATH, _META_FILE)):
+        raise SystemExit("Local index is empty; run: python -m app.vector_index migrate")
+    path = os.path.join(target_dir, "vector_index")
+    os.makedirs(path)
+    source = sqlite3.connect(os.path.join(VECTOR_INDEX_PATH, _META_FILE))
+    target = sqlite3.connect(os.path.join(path, _META_FILE))
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+    for name in os.listdir(VECTOR_INDEX_PATH):
+        if not name.startswith(_META_FILE):
+            shutil.copy2(os.path.join(VECTOR_INDEX_PATH, name), os.path.join(path, name))
+    return path
+
+
+def make_queries(index_path: str, num_queries: int, seed: int = 7) -> np.ndarray:
+    """Perturbed copies of stored vectors, normalized like real query embeddings."""
+    from app.vector_index import LocalVectorIndex
+
+    index = LocalVectorIndex(None, path=index_path, quantization="none")
+    index._refresh()
+    if index._matrix is None:
+        raise SystemExit("Local index is empty; run: python -m app.vector_index migrate")
+    rng = np.random.default_rng(seed)
+    alive = np.flatnonzero(index._alive)
+    rows = rng.choice(alive, size=num_queries, replace=len(alive) < num_queries)
+    queries = np.asarray(index._matrix[rows]) + rng.normal(0, 0.02, size=(num_queries, index._dim)).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def open_backend(backend: str, index_path: str):
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+        from app.vector_store import VECTOR_DB_PATH
+        return Chroma(persist_directory=VECTOR_DB_PATH, collection_name="candidate_profiles")
+    from app.vector_index import LocalVectorIndex
+    # "local", "local-float16", "local-int8"
+    quantization = backend.split("-", 1)[1] if "-" in backend else "none"
+    return LocalVectorIndex(None, path=index_path, quantization=quantization)
+
+
+def ensure_quantized(index_path: str, mode: str):
+    from app.vector_index import LocalVectorIndex
+
+    index = LocalVectorIndex(None, path=index_path, quantization=mode)
+    if index._state(f"{mode}_rows", -1) != index._state("rows"):
+        index.build_quantized()
+
+
+def run_backend(backend: str, index_path: str, queries_path: str, k: int) -> dict:
+    """Child process: opens one backend, times every query, reports latency and RSS."""
+    queries = np.load(queries_path)
+    baseline = rss_mb()
+
+    started = time.perf_counter()
+    store = open_backend(backend, index_path)
+    # First query pays for loading / mapping the index
+    store.similarity_search_by_vector(queries[0].tolist(), k=k)
+    open_s = time.perf_counter() - started
+
+    latencies = []
+    results = []
+    for query in queries:
+        t0 = time.perf_counter()
+        docs = store.similarity_search_by_vector(query.tolist(), k=k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append([doc.id or doc.page_content for doc in docs])
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "open_s": round(open_s, 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+        "max_ms": round(latencies[-1], 2),
+        "rss_mb": round(rss_mb() - baseline, 1),
+        "results": results,
+    }
+
+
+def recall(results: list, exact: list) -> float:
+    hits = sum(len(set(found) & set(truth)) for found, truth in zip(results, exact))
+    return hits / max(sum(len(truth) for truth in exact), 1)
+
+
+def main():
+    args = sys.argv[1:]
+    num_queries = int(args[args.index("--queries") + 1]) if "--queries" in args else 200
+    k = int(args[args.index("--k") + 1]) if "--k" in args else 15
+
+    if "--child" in args:
+        backend = args[args.index("--child") + 1]
+        print(json.dumps(run_backend(
+            backend, args[args.index("--index-path") + 1], args[args.index("--queries-file") + 1], k
+        )))
+        return
+
+    scratch_dir = tempfile.mkdtemp(prefix="vector_benchmark_")
+    index_path = scratch_copy(scratch_dir)
+    queries_path = os.path.join(scratch_dir, "queries.npy")
+    np.save(queries_path, make_queries(index_path, num_queries))
+    for mode in ("float16", "int8"):
+        ensure_quantized(index_path, mode)
+
+    backends = ["local", "local-float16", "local-int8"]
+    if "--skip-chroma" not in args:
+        backends.insert(0, "chroma")
+
+    print("🚀 Vector backend benchmark")
+    print("=" * 60)
+    results = []
+    try:
+        for backend in backends:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", backend, "--index-path", index_path,
+                 "--queries-file", queries_path, "--k", str(k)],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"❌ {backend} failed:\n{proc.stderr[-2000:]}")
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    exact = next((r["results"] for r in results if r["backend"] == "local"), None)
+    print(f"{num_queries} queries, k={k}")
+    print(f"{'backend':<15}{'open s':>8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'RSS MB':>9}{'recall':>9}")
+    for r in results:
+        r_recall = f"{recall(r['results'], exact):.3f}" if exact is not None else "n/a"
+        print(
+            f"{r['backend']:<15}{r['open_s']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+            f"{r['max_ms']:>9}{r['rss_mb']:>9}{r_recall:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()